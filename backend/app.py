@@ -1,16 +1,69 @@
-from fastapi import FastAPI
-from fastapi.encoders import jsonable_encoder
+import asyncio
+from datetime import date
+from typing import Optional
+from contextlib import asynccontextmanager
+import orjson
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from services.companies_service import get_companies_from_db
-from services.sectors_service import get_sectors_from_db
-from services.prediction_service import get_prediction_from_db
-from services.comparison_service import comparar_dados_empresa
-from services.statistics_service import gerar_estatisticas_gerais
-from services.statistics_service_sector import gerar_estatisticas_por_setor
+from services.companies_service import (
+    get_companies_from_db_async,
+    search_companies_async,
+)
+from services.sectors_service import get_sectors_from_db_async
+from services.prediction_service import (
+    get_prediction_from_db_async,
+    get_predictions_from_db_async,
+    get_sector_predictions_from_db_async,
+    juntar_graficos,
+)
+from services.statistics_service import (
+    gerar_estatisticas_gerais_async,
+    gerar_estatisticas_todos_setores_async,
+)
+from services.statistics_service_sector import gerar_estatisticas_por_setor_async
+from services.dashboard_service import gerar_dashboard_async
+from services.cache import (
+    aggregates_cache,
+    get_data_version_async,
+    invalidate_all,
+    listen_data_version,
+    ticker_cache,
+)
+from services.dimensions import dimensions
+from services.conditional import not_modified, validator_headers
+from services.single_flight import single_flight
+from services.snapshot import comparacao_async, snapshot
+from services.serialization import FastJSONResponse, json_response_async
+from services import metrics
+from services.slow_queries import slow_query_log
+from services.arrow_format import (
+    VARY_ACCEPT,
+    ArrowStreamResponse,
+    prediction_to_arrow,
+    statistics_to_arrow,
+    wants_arrow,
+)
+from config.db import close_async_pools, close_pools, open_async_pools
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await open_async_pools()
+    # esvazia os caches quando o build publica nova versão (NOTIFY)
+    listener = asyncio.create_task(listen_data_version())
+    # snapshot do build mapeado em segundo plano (warm start)
+    warm_start = asyncio.create_task(asyncio.to_thread(snapshot.load))
+    yield
+    listener.cancel()
+    warm_start.cancel()
+    await close_async_pools()
+    close_pools()
 
 
-app = FastAPI()
+# orjson com suporte a numpy; as rotas de dados devolvem FastJSONResponse
+# diretamente para pular o jsonable_encoder
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,31 +72,223 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# latência e requisições em andamento por rota (expostas em /metrics)
+app.add_middleware(metrics.MetricsMiddleware)
+
+async def _data_version():
+    """Sonda a versão dos dados e mantém o índice de dimensões nela."""
+    version = await get_data_version_async()
+    await dimensions.aget(version)
+    return version
 
 @app.get("/")
 def test():
     return {"message": "template with tailwind + ts + python + react + electron :)"}
 
 @app.get("/companies")
-def get_companies():
-    return get_companies_from_db()
+async def get_companies(request: Request, sector: Optional[str] = None):
+    version = await _data_version()
+    if (resposta := not_modified(request, version)) is not None:
+        return resposta
+    # direto do índice de dimensões em memória
+    payload = await get_companies_from_db_async(version, sector)
+    return FastJSONResponse(payload, headers=validator_headers(version))
+
+@app.get("/companies/search")
+async def search_companies(
+    request: Request,
+    q: str = Query(..., description="Trecho do ticker ou do nome (sem acento também serve)"),
+    limit: int = Query(10, ge=1, le=50),
+):
+    version = await _data_version()
+    if (resposta := not_modified(request, version)) is not None:
+        return resposta
+    # índice de prefixos/trigramas montado a partir das dimensões
+    payload = await search_companies_async(q, limit, version)
+    return FastJSONResponse(payload, headers=validator_headers(version))
 
 @app.get("/sectors")
-def get_sectors():
-    return get_sectors_from_db()
+async def get_sectors(request: Request):
+    version = await _data_version()
+    if (resposta := not_modified(request, version)) is not None:
+        return resposta
+    # direto do índice de dimensões em memória
+    payload = await get_sectors_from_db_async(version)
+    return FastJSONResponse(payload, headers=validator_headers(version))
 
 @app.get("/prediction/{ticker}")
-def get_prediction(ticker: str):
-    return get_prediction_from_db(ticker)
+async def get_prediction(
+    ticker: str,
+    request: Request,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    max_points: Optional[int] = Query(None, ge=3),
+):
+    """
+    JSON por padrão; Arrow IPC com Accept: application/vnd.apache.arrow.stream.
+    from/to recortam o período e max_points limita o tamanho do gráfico.
+    """
+    version = await _data_version()
+    if (resposta := not_modified(request, version, VARY_ACCEPT)) is not None:
+        return resposta
+    headers = {**validator_headers(version), **VARY_ACCEPT}
+
+    chave = ("prediction", ticker, date_from, date_to, max_points, version.token)
+    payload = ticker_cache.get(chave)
+    if payload is None:
+        payload = await single_flight.ado(
+            "prediction",
+            chave[1:],
+            lambda: get_prediction_from_db_async(ticker, date_from, date_to, max_points),
+        )
+        ticker_cache.set(chave, payload)
+    if wants_arrow(request):
+        return await asyncio.to_thread(
+            lambda: ArrowStreamResponse(
+                prediction_to_arrow(orjson.loads(payload)), headers=headers
+            )
+        )
+    # JSON já montado pelo Postgres: só repassa os bytes
+    return Response(payload, media_type="application/json", headers=headers)
+
+@app.get("/predictions")
+async def get_predictions(tickers: str = Query(..., description="Tickers separados por vírgula")):
+    """Gráficos de várias empresas em uma ida ao banco: {ticker: {graph, price, ...}}."""
+    lista = tuple(dict.fromkeys(t.strip() for t in tickers.split(",") if t.strip()))
+    payload = await single_flight.ado(
+        "predictions", tuple(sorted(lista)), lambda: get_predictions_from_db_async(lista)
+    )
+    return Response(juntar_graficos(payload, lista), media_type="application/json")
+
+@app.get("/predictions/sector/{sector_id}")
+async def get_sector_predictions(sector_id: int):
+    payload = await single_flight.ado(
+        "predictions_sector", sector_id,
+        lambda: get_sector_predictions_from_db_async(sector_id),
+    )
+    return Response(juntar_graficos(payload), media_type="application/json")
 
 @app.get("/comparison/{ticker}")
-def get_comparison(ticker: str):
-    return comparar_dados_empresa(ticker)
+async def get_comparison(ticker: str):
+    version = await _data_version()
+    payload = await comparacao_async(ticker, version)
+    return Response(payload, media_type="application/json")
+
+@app.get("/statistics")
+async def get_statistics(request: Request):
+    """Estatísticas gerais + métricas de todos os setores (uma leitura)."""
+    version = await _data_version()
+    if (resposta := not_modified(request, version)) is not None:
+        return resposta
+    headers = validator_headers(version)
+    if (pronto := snapshot.get("statistics", "all", version)) is not None:
+        return Response(pronto, media_type="application/json", headers=headers)
+
+    payload = await single_flight.ado(
+        "statistics_all",
+        version,
+        lambda: aggregates_cache.aget_or_compute(
+            "all_sectors", gerar_estatisticas_todos_setores_async, version
+        ),
+    )
+    return await json_response_async(payload, headers=headers)
 
 @app.get("/statistics/{sector_id}")
-def get_statistics_by_sector(sector_id: int):
-    payload = {
-        "general": gerar_estatisticas_gerais(),
-        "sector":  gerar_estatisticas_por_setor(sector_id)
-    }
-    return JSONResponse(content=jsonable_encoder(payload))
+async def get_statistics_by_sector(sector_id: int, request: Request):
+    version = await _data_version()
+    if (resposta := not_modified(request, version, VARY_ACCEPT)) is not None:
+        return resposta
+    headers = {**validator_headers(version), **VARY_ACCEPT}
+
+    general = snapshot.get("statistics", "general", version)
+    sector = snapshot.get("statistics", str(sector_id), version)
+    if general is not None and sector is not None:
+        pronto = b'{"general":' + general + b',"sector":' + sector + b"}"
+        if wants_arrow(request):
+            return await asyncio.to_thread(
+                lambda: ArrowStreamResponse(
+                    statistics_to_arrow(orjson.loads(pronto)), headers=headers
+                )
+            )
+        return Response(pronto, media_type="application/json", headers=headers)
+
+    async def _payload():
+        general, sector = await asyncio.gather(
+            aggregates_cache.aget_or_compute(
+                "general", gerar_estatisticas_gerais_async, version
+            ),
+            aggregates_cache.aget_or_compute(
+                ("sector", sector_id),
+                lambda: gerar_estatisticas_por_setor_async(sector_id),
+                version,
+            ),
+        )
+        return {"general": general, "sector": sector}
+
+    payload = await single_flight.ado("statistics", (sector_id, version), _payload)
+    if wants_arrow(request):
+        return await asyncio.to_thread(
+            lambda: ArrowStreamResponse(statistics_to_arrow(payload), headers=headers)
+        )
+    return await json_response_async(payload, headers=headers)
+
+@app.get("/company/{ticker}/dashboard")
+async def get_company_dashboard(ticker: str, request: Request):
+    """Gráfico + comparação + estatísticas numa única chamada."""
+    version = await _data_version()
+    if ticker not in (await dimensions.aget(version)).ticker_id:
+        raise HTTPException(status_code=404, detail=f"Ticker {ticker} não encontrado")
+    if (resposta := not_modified(request, version)) is not None:
+        return resposta
+    headers = validator_headers(version)
+
+    # montado a cada chamada: gráfico e comparação ficam no cache por
+    # ticker e as estatísticas (compartilhadas) no de agregados
+    payload = await single_flight.ado(
+        "dashboard", (ticker, version.token), lambda: gerar_dashboard_async(ticker, version)
+    )
+    return Response(payload, media_type="application/json", headers=headers)
+
+@app.post("/statistics/invalidate")
+def invalidate_statistics():
+    """Chamado pelo build após inserir novas previsões."""
+    invalidate_all()
+    return {"invalidated": True}
+
+@app.get("/admin/cache")
+def get_cache_stats():
+    """Acertos/faltas e ocupação do cache de respostas por ticker."""
+    return ticker_cache.stats()
+
+@app.delete("/admin/cache")
+def flush_cache():
+    invalidate_all()
+    return {"flushed": True}
+
+@app.get("/admin/single-flight")
+def get_single_flight_stats():
+    """Quantas computações rodaram e quantas requisições foram coalescidas."""
+    return single_flight.stats()
+
+@app.get("/admin/slow-queries")
+def get_slow_queries(limit: int = Query(20, ge=1, le=200)):
+    """Consultas acima do limite, das que mais somaram tempo às demais."""
+    return slow_query_log.summary(limit)
+
+@app.put("/admin/slow-queries")
+def configure_slow_queries(
+    threshold_ms: Optional[float] = Query(None, ge=0, description="Vazio desliga o log"),
+    explain: bool = True,
+):
+    slow_query_log.configure(threshold_ms, explain)
+    return slow_query_log.summary(0)
+
+@app.delete("/admin/slow-queries")
+def clear_slow_queries():
+    slow_query_log.clear()
+    return {"cleared": True}
+
+@app.get("/metrics")
+def get_metrics():
+    """Latência por rota, consultas (tempo/linhas) e tempo em pandas (Prometheus)."""
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
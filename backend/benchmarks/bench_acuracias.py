@@ -0,0 +1,123 @@
+"""
+Micro-benchmark de adicionar_variancias / calcular_acuracias:
+implementação original (apply linha a linha) vs. vetorizada, em
+DataFrames sintéticos de 10k, 100k e 1M linhas. A paridade entre as
+duas é verificada em tests/test_acuracias.py.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_acuracias [N ...]
+"""
+import sys
+import time
+import warnings
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+from services.comparison_service import adicionar_variancias, calcular_acuracias
+
+MODELOS = ["LSTM", "GRU", "XGBOOST"]
+
+
+# ------------------------------------------------------------------
+# Implementação original (referência)
+# ------------------------------------------------------------------
+def _legacy_variancias(df):
+    ref_dict = (
+        df.groupby("b3_code_id")["price_history_value_anterior"]
+        .first()
+        .to_dict()
+    )
+
+    def _calc(row):
+        ref = ref_dict.get(row["b3_code_id"])
+        if pd.isna(ref):
+            return pd.Series([None, None, None])
+        pred = "up" if row["value"] - ref >= 0 else "down"
+        real = "up" if row["price_history_value"] - ref >= 0 else "down"
+        return pd.Series([pred, real, pred == real])
+
+    df[["variance_prediction", "real_variance", "variance_accuracy"]] = (
+        df.apply(_calc, axis=1)
+    )
+    return df
+
+
+def _legacy_acuracias(df):
+    base = df.dropna(subset=["variance_accuracy"])
+
+    def _agg(group):
+        total = len(group)
+        total_acertos = group["variance_accuracy"].sum()
+        geral = round(total_acertos / total * 100, 2) if total else None
+        up = group["variance_prediction"] == "up"
+        dn = group["variance_prediction"] == "down"
+        certo = group["variance_prediction"] == group["real_variance"]
+        tot_up, tot_dn = len(group[up]), len(group[dn])
+        up_ok, dn_ok = len(group[up & certo]), len(group[dn & certo])
+        return pd.Series({
+            "up_accuracy_percent": round(up_ok / tot_up * 100, 2) if tot_up else None,
+            "down_accuracy_percent": round(dn_ok / tot_dn * 100, 2) if tot_dn else None,
+            "geral_accuracy_percent": geral,
+        })
+
+    return (
+        base.groupby("model_name").apply(_agg).reset_index(),
+        base.groupby("date").apply(_agg).reset_index(),
+    )
+
+
+# ------------------------------------------------------------------
+# Dados sintéticos
+# ------------------------------------------------------------------
+def _frame(n, seed=0, decimal=False):
+    """n linhas: empresas × datas × modelos, com algumas referências nulas."""
+    rng = np.random.default_rng(seed)
+    empresas = max(n // 300, 2)
+    datas = pd.date_range("2024-01-01", periods=100).date
+    real = rng.uniform(5, 80, n).round(2)
+    anterior = real * (1 + rng.normal(0, 0.02, n))
+    anterior[rng.random(n) < 0.05] = np.nan
+    df = pd.DataFrame({
+        "date": datas[rng.integers(0, len(datas), n)],
+        "model_name": rng.choice(MODELOS, n),
+        "value": real * (1 + rng.normal(0, 0.03, n)),
+        "b3_code_id": rng.integers(1, empresas + 1, n),
+        "price_history_value": real,
+        "price_history_value_anterior": anterior,
+    })
+    # empresa sem nenhuma referência → linhas sem variância
+    df.loc[df["b3_code_id"] == 1, "price_history_value_anterior"] = np.nan
+    if decimal:
+        for col in ("value", "price_history_value", "price_history_value_anterior"):
+            df[col] = [None if pd.isna(v) else Decimal(str(round(v, 4)))
+                       for v in df[col]]
+    return df.sort_values(["b3_code_id", "date"], ascending=[True, False],
+                          ignore_index=True)
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    # groupby().apply da referência emite DeprecationWarning no pandas 2.2
+    warnings.simplefilter("ignore", DeprecationWarning)
+    sizes = [int(a) for a in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+
+    print(f"{'linhas':>10} {'original (s)':>13} {'vetorizado (s)':>15} {'speedup':>9}")
+    for n in sizes:
+        df = _frame(n)
+        antigo, t_old_v = _timed(_legacy_variancias, df.copy())
+        _, t_old_a = _timed(_legacy_acuracias, antigo)
+        novo, t_new_v = _timed(adicionar_variancias, df.copy())
+        _, t_new_a = _timed(calcular_acuracias, novo)
+        t_old, t_new = t_old_v + t_old_a, t_new_v + t_new_a
+        print(f"{n:>10} {t_old:>13.3f} {t_new:>15.3f} {t_old / t_new:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
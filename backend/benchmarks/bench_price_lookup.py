@@ -0,0 +1,82 @@
+"""
+Benchmark de fetch_price_history_columns: laço N+1 (versão antiga)
+vs. consulta em lote (LATERAL join), para frações crescentes da
+tabela predictions, além da latência de comparar_dados_empresa.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_price_lookup [TICKER]
+"""
+import sys
+import time
+
+from config.db import get_conn
+from services.comparison_service import (
+    comparar_dados_empresa,
+    fetch_price_history_columns,
+    load_all_predictions,
+)
+
+
+def _legacy_fetch(conn, df):
+    """Implementação original: duas consultas por linha."""
+    atual, anterior = [], []
+    with conn.cursor() as cur:
+        for _, row in df.iterrows():
+            col = row["history_column_name"].lower()
+            cur.execute(
+                f"""SELECT ph."{col}"
+                    FROM price_history ph
+                    WHERE ph.date = %s AND ph.company_id = %s""",
+                (row["date"], row["b3_code_id"]),
+            )
+            atual.append((cur.fetchone() or [None])[0])
+            cur.execute(
+                f"""SELECT ph."{col}"
+                    FROM price_history ph
+                    WHERE ph.date < %s AND ph.company_id = %s
+                    ORDER BY ph.date DESC
+                    LIMIT 1""",
+                (row["date"], row["b3_code_id"]),
+            )
+            anterior.append((cur.fetchone() or [None])[0])
+    return atual, anterior
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    ticker = sys.argv[1] if len(sys.argv) > 1 else None
+
+    with get_conn(readonly=True) as conn:
+        df_all = load_all_predictions(conn)
+        total = len(df_all)
+        sizes = sorted({n for n in (100, 1_000, 10_000, total) if n <= total})
+
+        print(f"predictions: {total} linhas")
+        print(f"{'linhas':>10} {'laço (ms)':>12} {'lote (ms)':>12} {'speedup':>9}")
+        for n in sizes:
+            df = df_all.head(n)
+            legacy, t_legacy = _timed(_legacy_fetch, conn, df)
+            bulk, t_bulk = _timed(fetch_price_history_columns, conn, df)
+            assert legacy == bulk, f"resultados divergentes para {n} linhas"
+            print(f"{n:>10} {t_legacy:>12.1f} {t_bulk:>12.1f} {t_legacy / t_bulk:>8.1f}x")
+
+        if ticker is None and total:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT b3_code FROM companies WHERE id = %s",
+                    (int(df_all["b3_code_id"].iloc[0]),),
+                )
+                ticker = cur.fetchone()[0]
+
+    if ticker:
+        _, t_req = _timed(comparar_dados_empresa, ticker)
+        print(f"\ncomparar_dados_empresa({ticker}): {t_req:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark da montagem do payload de estatísticas: caminho antigo
+(applymap + to_dict + jsonable_encoder + JSONResponse) vs. novo
+(frame_to_records + orjson), para 1k, 10k e 100k winners sintéticos.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_serialization [N ...]
+"""
+import json
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from services.serialization import FastJSONResponse, frame_to_records
+
+
+def _legacy_to_py(obj):
+    if isinstance(obj, (np.integer,)):
+        return int(obj)
+    if isinstance(obj, (np.floating,)):
+        return float(obj)
+    if isinstance(obj, (np.ndarray,)):
+        return obj.tolist()
+    if isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    return obj
+
+
+def _winners(n, seed=0):
+    """Winners já pós-processados, como em calcular_estatisticas."""
+    rng = np.random.default_rng(seed)
+    y_true = rng.uniform(5, 80, n)
+    y_pred = y_true * (1 + rng.normal(0, 0.02, n))
+    prev = y_true * (1 + rng.normal(0, 0.02, n))
+    df = pd.DataFrame({
+        "date": pd.date_range("2015-01-01", periods=n, freq="h").date,
+        "b3_code_id": rng.integers(1, 400, n),
+        "model": rng.choice(["LSTM", "GRU", "XGBOOST"], n),
+        "y_pred": y_pred,
+        "y_true": y_true,
+        "prev_close": prev,
+    })
+    df["abs_err"] = np.abs(df["y_true"] - df["y_pred"])
+    df["pct_err"] = df["abs_err"] / df["y_true"] * 100
+    df["hit"] = np.sign(df["y_true"] - prev) == np.sign(df["y_pred"] - prev)
+    return df
+
+
+def _old(winners, stats):
+    records = (
+        winners
+        .applymap(_legacy_to_py)
+        .assign(date=lambda df: df["date"].astype(str))
+        .to_dict(orient="records")
+    )
+    payload = {"general": {"stats": stats, "winners": records}}
+    return JSONResponse(content=jsonable_encoder(payload)).body
+
+
+def _new(winners, stats):
+    records = frame_to_records(winners.assign(date=winners["date"].astype(str)))
+    payload = {"general": {"stats": stats, "winners": records}}
+    return FastJSONResponse(payload).body
+
+
+def _best(fn, *args, repeat=3):
+    tempos = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        tempos.append(time.perf_counter() - start)
+    return result, min(tempos) * 1000
+
+
+def main():
+    warnings.simplefilter("ignore", FutureWarning)  # applymap (pandas 2.2)
+    sizes = [int(a) for a in sys.argv[1:]] or [1_000, 10_000, 100_000]
+    stats = {"MAE": 0.31, "RMSE": 0.5, "R2": 0.99, "n_obs": 0}
+
+    print(f"{'winners':>10} {'antigo (ms)':>12} {'orjson (ms)':>12} {'speedup':>9}")
+    for n in sizes:
+        winners = _winners(n)
+        old, t_old = _best(_old, winners, stats)
+        new, t_new = _best(_new, winners, stats)
+        assert json.loads(old) == json.loads(new), "payloads divergentes"
+        print(f"{n:>10} {t_old:>12.1f} {t_new:>12.1f} {t_old / t_new:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
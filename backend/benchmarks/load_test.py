@@ -0,0 +1,514 @@
+"""
+Teste de carga HTTP da API contra um banco sintético local.
+
+`seed` recria o banco de benchmark (nunca o tcc_b3) com um universo B3
+sintético: setores, empresas, anos de pregões diários, modelos e dias de
+previsão. Em seguida roda os mesmos passos de pós-processamento do
+run_build (daily_winners, data_version, company_comparisons e snapshot).
+
+`run` sobe a API apontada para esse banco (ou usa --url) e dispara
+/companies, /prediction/{ticker}, /comparison/{ticker} e
+/statistics/{sector_id} com concorrência controlada. Para cada rota,
+relata latência p50/p95/p99, vazão e idas ao banco por requisição
+(diferença dos contadores de /metrics). Com --cold a API sobe sem o
+snapshot e sem company_comparisons, e os caches são esvaziados antes
+de cada rota. O resultado vai para um JSON em
+benchmarks/results/, para comparar execuções ao longo do tempo.
+
+Uso (a partir de backend/):
+    python -m benchmarks.load_test seed --companies 100 --years 5 --models 3 --prediction-days 60
+    python -m benchmarks.load_test run --requests 500 --concurrency 16
+    python -m benchmarks.load_test all          # seed + run
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import requests
+from psycopg import connect, sql
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+BENCH_DIR = Path(__file__).resolve().parent
+RESULTS_DIR = BENCH_DIR / "results"
+SNAPSHOT_DIR = BENCH_DIR / "snapshot"   # snapshot do banco sintético
+
+BENCH_DB = "tcc_b3_bench"
+COLD_TABLE = "company_comparisons_cold"  # nome durante a medição --cold
+BENCH_PORT = 9100
+READ_ONLY_USER = "compareter"           # mesmo papel de config/db.py
+
+SETORES = [
+    "Energia", "Financeiro", "Saúde", "Varejo", "Mineração",
+    "Utilidade Pública", "Construção", "Tecnologia", "Agronegócio", "Transporte",
+]
+NOMES = [
+    "Petróleo", "Mineração Vale", "Banco União", "Elétrica São João",
+    "Saúde Integrada", "Açúcar e Álcool", "Construtora Paraná", "Telecomunicações",
+    "Siderúrgica Nacional", "Logística Atlântico", "Varejo Popular", "Agropecuária",
+]
+MODELOS = ["LSTM", "GRU", "XGBOOST", "ARIMA", "PROPHET", "TCN"]
+HISTORY_COLUMNS = ["open", "high", "low", "volume", "dividends", "close"]
+DIAS_FUTUROS = 5        # previsões além do último pregão (ainda sem preço)
+ULTIMO_PREGAO = date(2025, 6, 30)
+
+ROTAS = ["companies", "prediction", "comparison", "statistics"]
+
+SCHEMA = """
+CREATE TABLE sectors (
+    id   SERIAL PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE TABLE companies (
+    id        SERIAL PRIMARY KEY,
+    b3_code   TEXT UNIQUE NOT NULL,
+    name      TEXT NOT NULL,
+    sector_id INTEGER REFERENCES sectors (id)
+);
+CREATE TABLE models (
+    id    SERIAL PRIMARY KEY,
+    model TEXT NOT NULL
+);
+CREATE TABLE history_columns (
+    id          SERIAL PRIMARY KEY,
+    column_name TEXT NOT NULL
+);
+CREATE TABLE price_history (
+    id                 SERIAL PRIMARY KEY,
+    company_id         INTEGER NOT NULL REFERENCES companies (id),
+    date               DATE    NOT NULL,
+    open               NUMERIC,
+    high               NUMERIC,
+    low                NUMERIC,
+    close              NUMERIC,
+    volume             BIGINT,
+    dividends          NUMERIC,
+    stock_splits       NUMERIC,
+    updated_by_user_id INTEGER,
+    CONSTRAINT unique_price_entry UNIQUE (company_id, date)
+);
+CREATE TABLE predictions (
+    id                 SERIAL PRIMARY KEY,
+    date               DATE    NOT NULL,
+    model_id           INTEGER REFERENCES models (id),
+    value              NUMERIC,
+    b3_code_id         INTEGER REFERENCES companies (id),
+    history_columns_id INTEGER REFERENCES history_columns (id),
+    updated_by_user_id INTEGER,
+    updated_at         TIMESTAMP DEFAULT now()
+);
+CREATE INDEX predictions_b3_code_id_date_idx ON predictions (b3_code_id, date);
+"""
+
+COPY_PRICES = """
+COPY price_history (company_id, date, open, high, low, close,
+                    volume, dividends, stock_splits, updated_by_user_id)
+FROM STDIN
+"""
+COPY_PREDICTIONS = """
+COPY predictions (date, model_id, value, b3_code_id, history_columns_id, updated_by_user_id)
+FROM STDIN
+"""
+
+
+def _connect(dbname: str, autocommit: bool = False):
+    # mesmas credenciais dos scripts do build
+    return connect(
+        dbname=dbname,
+        user="postgres",
+        password="postgres",
+        host="localhost",
+        port="5432",
+        autocommit=autocommit,
+    )
+
+
+def _usar_banco(db: str) -> None:
+    """Aponta config/db.py e o snapshot para o banco de benchmark (antes de importá-los)."""
+    os.environ["TCC_B3_DB"] = db
+    os.environ["TCC_B3_SNAPSHOT_DIR"] = str(SNAPSHOT_DIR)
+    for caminho in (BACKEND_DIR, BACKEND_DIR / "build"):
+        if str(caminho) not in sys.path:
+            sys.path.append(str(caminho))
+
+
+# ------------------------------------------------------------------
+# Universo sintético
+# ------------------------------------------------------------------
+def _ticker(i: int) -> str:
+    letras = ""
+    for _ in range(4):
+        i, resto = divmod(i, 26)
+        letras = chr(ord("A") + resto) + letras
+    return f"{letras}3.SA"
+
+
+def gerar_universo(companies: int, years: int, models: int, prediction_days: int, seed: int):
+    """
+    Preços em passeio aleatório geométrico por empresa e previsões de cada
+    modelo em torno do fechamento (erro crescente por modelo), nos últimos
+    `prediction_days` pregões e em DIAS_FUTUROS dias à frente.
+    """
+    rng = np.random.default_rng(seed)
+    datas = pd.bdate_range(end=ULTIMO_PREGAO, periods=years * 252).date
+    n_dias = len(datas)
+
+    retornos = rng.normal(0.0003, 0.02, size=(companies, n_dias))
+    fechamentos = rng.uniform(5, 80, size=(companies, 1)) * np.exp(np.cumsum(retornos, axis=1))
+    spread = np.abs(rng.normal(0, 0.01, size=fechamentos.shape))
+    volumes = rng.integers(10_000, 5_000_000, size=fechamentos.shape)
+
+    precos = pd.DataFrame({
+        "company_id": np.repeat(np.arange(1, companies + 1), n_dias),
+        "date": np.tile(datas, companies),
+        "open": (fechamentos * (1 + rng.normal(0, 0.005, fechamentos.shape))).ravel().round(4),
+        "high": (fechamentos * (1 + spread)).ravel().round(4),
+        "low": (fechamentos * (1 - spread)).ravel().round(4),
+        "close": fechamentos.ravel().round(4),
+        "volume": volumes.ravel(),
+        "dividends": 0,
+        "stock_splits": 0,
+        "updated_by_user_id": 1,
+    })
+
+    prediction_days = min(prediction_days, n_dias)
+    futuras = pd.bdate_range(start=ULTIMO_PREGAO, periods=DIAS_FUTUROS + 1)[1:].date
+    dias_previstos = np.concatenate([datas[-prediction_days:], futuras])
+    base = np.concatenate(
+        [fechamentos[:, -prediction_days:],
+         np.repeat(fechamentos[:, -1:], len(futuras), axis=1)],
+        axis=1,
+    )
+    close_id = HISTORY_COLUMNS.index("close") + 1
+
+    previsoes = []
+    for m in range(models):
+        ruido = rng.normal(0, 0.01 * (m + 1), size=base.shape)
+        previsoes.append(pd.DataFrame({
+            "date": np.tile(dias_previstos, companies),
+            "model_id": m + 1,
+            "value": (base * (1 + ruido)).ravel().round(4),
+            "b3_code_id": np.repeat(np.arange(1, companies + 1), len(dias_previstos)),
+            "history_columns_id": close_id,
+            "updated_by_user_id": 1,
+        }))
+    return precos, pd.concat(previsoes, ignore_index=True)
+
+
+def seed(args) -> dict:
+    """Recria o banco de benchmark e roda o pós-processamento do build."""
+    inicio = time.perf_counter()
+    setores = SETORES[: max(1, min(args.sectors, len(SETORES)))]
+    modelos = [
+        MODELOS[m] if m < len(MODELOS) else f"MODELO_{m + 1}" for m in range(args.models)
+    ]
+
+    with _connect("postgres", autocommit=True) as admin:
+        admin.execute(sql.SQL("DROP DATABASE IF EXISTS {} WITH (FORCE)").format(sql.Identifier(args.db)))
+        admin.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(args.db)))
+
+    precos, previsoes = gerar_universo(
+        args.companies, args.years, args.models, args.prediction_days, args.seed
+    )
+
+    with _connect(args.db) as conn, conn.cursor() as cur:
+        cur.execute(SCHEMA)
+        cur.executemany("INSERT INTO sectors (name) VALUES (%s)", [(s,) for s in setores])
+        cur.executemany("INSERT INTO models (model) VALUES (%s)", [(m,) for m in modelos])
+        cur.executemany(
+            "INSERT INTO history_columns (column_name) VALUES (%s)",
+            [(c,) for c in HISTORY_COLUMNS],
+        )
+        cur.executemany(
+            "INSERT INTO companies (b3_code, name, sector_id) VALUES (%s, %s, %s)",
+            [
+                (_ticker(i), f"{NOMES[i % len(NOMES)]} {i + 1}", i % len(setores) + 1)
+                for i in range(args.companies)
+            ],
+        )
+        for comando, df in ((COPY_PRICES, precos), (COPY_PREDICTIONS, previsoes)):
+            with cur.copy(comando) as copy:
+                for linha in df.itertuples(index=False):
+                    copy.write_row(linha)
+        cur.execute(
+            sql.SQL("GRANT SELECT ON ALL TABLES IN SCHEMA public TO {}").format(
+                sql.Identifier(READ_ONLY_USER)
+            )
+        )
+        conn.commit()
+    carga = time.perf_counter() - inicio
+
+    # passos do run_build, com o banco de benchmark
+    _usar_banco(args.db)
+    from data_prediction.utils.company_comparisons import run_company_comparisons
+    from data_prediction.utils.daily_winners import refresh_daily_winners
+    from data_prediction.utils.data_version import bump_data_version
+    from services.snapshot import write_snapshot
+
+    refresh_daily_winners()
+    bump_data_version()
+    run_company_comparisons()
+    with _connect(args.db, autocommit=True) as conn:
+        conn.execute("ANALYZE")
+    write_snapshot()
+
+    universo = {
+        "database": args.db,
+        "sectors": len(setores),
+        "companies": args.companies,
+        "years": args.years,
+        "models": args.models,
+        "prediction_days": args.prediction_days,
+        "price_rows": len(precos),
+        "prediction_rows": len(previsoes),
+        "seed": args.seed,
+        "seed_seconds": round(time.perf_counter() - inicio, 2),
+    }
+    print(
+        f"🌱 {args.db}: {args.companies} empresas, {len(precos)} preços, "
+        f"{len(previsoes)} previsões (carga {carga:.1f} s, total {universo['seed_seconds']} s)"
+    )
+    return universo
+
+
+# ------------------------------------------------------------------
+# Carga HTTP
+# ------------------------------------------------------------------
+def _subir_api(db: str, port: int, snapshot_dir: Path = SNAPSHOT_DIR) -> subprocess.Popen:
+    env = dict(os.environ, TCC_B3_DB=db, TCC_B3_SNAPSHOT_DIR=str(snapshot_dir))
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    url = f"http://localhost:{port}"
+    limite = time.time() + 60
+    while time.time() < limite:
+        if processo.poll() is not None:
+            raise RuntimeError(f"API encerrou ao subir (código {processo.returncode})")
+        try:
+            requests.get(f"{url}/", timeout=1)
+            return processo
+        except requests.RequestException:
+            time.sleep(0.2)
+    processo.terminate()
+    raise RuntimeError("API não respondeu em 60 s")
+
+
+def _idas_ao_banco(url: str) -> float:
+    """Total de consultas executadas pela API (soma dos _count de /metrics)."""
+    texto = requests.get(f"{url}/metrics", timeout=10).text
+    return sum(
+        float(linha.rsplit(" ", 1)[1])
+        for linha in texto.splitlines()
+        if linha.startswith("db_query_duration_seconds_count")
+    )
+
+
+def _caminhos(rota: str, url: str) -> list:
+    empresas = requests.get(f"{url}/companies", timeout=30).json()
+    if rota == "companies":
+        return ["/companies"]
+    if rota == "statistics":
+        return [f"/statistics/{sid}" for sid in sorted({c["sector_id"] for c in empresas})]
+    return [f"/{rota}/{c['ticker']}" for c in empresas]
+
+
+def _medir(url: str, caminhos: list, total: int, concorrencia: int, cold: bool) -> dict:
+    sessoes = {}
+
+    def _get(i: int):
+        # uma sessão (conexão keep-alive) por thread, como um cliente real
+        sessao = sessoes.setdefault(threading.get_ident(), requests.Session())
+        inicio = time.perf_counter()
+        resposta = sessao.get(url + caminhos[i % len(caminhos)], timeout=60)
+        return time.perf_counter() - inicio, resposta.status_code
+
+    # aquecimento: uma passada por todos os caminhos (fora da medição)
+    with ThreadPoolExecutor(concorrencia) as pool:
+        list(pool.map(_get, range(len(caminhos))))
+    if cold:
+        requests.delete(f"{url}/admin/cache", timeout=10)
+
+    consultas_antes = _idas_ao_banco(url)
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(concorrencia) as pool:
+        resultados = list(pool.map(_get, range(total)))
+    duracao = time.perf_counter() - inicio
+    consultas = _idas_ao_banco(url) - consultas_antes
+
+    for sessao in sessoes.values():
+        sessao.close()
+
+    latencias = np.array([r[0] for r in resultados]) * 1000
+    erros = sum(1 for _, status in resultados if status >= 400)
+    p50, p95, p99 = np.percentile(latencias, [50, 95, 99])
+    return {
+        "requests": total,
+        "errors": erros,
+        "concurrency": concorrencia,
+        "distinct_paths": len(caminhos),
+        "duration_s": round(duracao, 3),
+        "throughput_rps": round(total / duracao, 1),
+        "latency_ms": {
+            "min": round(float(latencias.min()), 2),
+            "mean": round(float(latencias.mean()), 2),
+            "p50": round(float(p50), 2),
+            "p95": round(float(p95), 2),
+            "p99": round(float(p99), 2),
+            "max": round(float(latencias.max()), 2),
+        },
+        "db_round_trips_per_request": round(consultas / total, 3),
+    }
+
+
+def descrever_universo(db: str):
+    """Tamanho do universo já semeado (quando `run` é chamado sozinho)."""
+    try:
+        with _connect(db) as conn:
+            (setores, empresas, modelos, precos, previsoes) = conn.execute(
+                """
+                SELECT (SELECT count(*) FROM sectors),
+                       (SELECT count(*) FROM companies),
+                       (SELECT count(*) FROM models),
+                       (SELECT count(*) FROM price_history),
+                       (SELECT count(*) FROM predictions)
+                """
+            ).fetchone()
+    except Exception:  # banco inexistente ou de outro formato
+        return None
+    return {
+        "database": db,
+        "sectors": setores,
+        "companies": empresas,
+        "models": modelos,
+        "price_rows": precos,
+        "prediction_rows": previsoes,
+    }
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@contextmanager
+def _sem_pre_calculados(db: str):
+    """
+    Tira company_comparisons do caminho da API durante a medição fria
+    (renomeada e restaurada ao final): /comparison calcula na hora.
+    """
+    with _connect(db, autocommit=True) as conn:
+        conn.execute(f"ALTER TABLE IF EXISTS company_comparisons RENAME TO {COLD_TABLE}")
+    try:
+        yield
+    finally:
+        with _connect(db, autocommit=True) as conn:
+            conn.execute(f"ALTER TABLE IF EXISTS {COLD_TABLE} RENAME TO company_comparisons")
+
+
+def run(args, universo=None) -> Path:
+    with ExitStack() as pilha:
+        snapshot_dir = SNAPSHOT_DIR
+        if args.cold:
+            # API sem snapshot e sem company_comparisons: mede o cálculo
+            # completo, não só a ida aos caches em memória
+            snapshot_dir = Path(pilha.enter_context(tempfile.TemporaryDirectory()))
+            pilha.enter_context(_sem_pre_calculados(args.db))
+
+        processo = None if args.url else _subir_api(args.db, args.port, snapshot_dir)
+        url = args.url or f"http://localhost:{args.port}"
+        try:
+            rotas = {}
+            for rota in args.endpoints:
+                caminhos = _caminhos(rota, url)
+                rotas[rota] = _medir(url, caminhos, args.requests, args.concurrency, args.cold)
+                r = rotas[rota]
+                print(
+                    f"{rota:>11}  p50 {r['latency_ms']['p50']:>8.2f} ms  "
+                    f"p95 {r['latency_ms']['p95']:>8.2f} ms  p99 {r['latency_ms']['p99']:>8.2f} ms  "
+                    f"{r['throughput_rps']:>8.1f} req/s  {r['db_round_trips_per_request']:>6.2f} consultas/req  "
+                    f"erros {r['errors']}"
+                )
+        finally:
+            if processo is not None:
+                processo.terminate()
+                processo.wait(timeout=30)
+
+    resultado = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _commit_atual(),
+        "python": platform.python_version(),
+        "url": url,
+        "cache": "cold" if args.cold else "warm",
+        "universe": universo or descrever_universo(args.db),
+        "endpoints": rotas,
+    }
+    RESULTS_DIR.mkdir(exist_ok=True)
+    destino = Path(args.out) if args.out else RESULTS_DIR / (
+        f"load_test_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    destino.write_text(json.dumps(resultado, indent=2, ensure_ascii=False))
+    print(f"📄 Resultado gravado em {destino}")
+    return destino
+
+
+# ------------------------------------------------------------------
+# Linha de comando
+# ------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("command", choices=["seed", "run", "all"], nargs="?", default="all")
+    parser.add_argument("--db", default=BENCH_DB, help="banco sintético (recriado pelo seed)")
+
+    universo = parser.add_argument_group("universo sintético (seed)")
+    universo.add_argument("--companies", type=int, default=50)
+    universo.add_argument("--sectors", type=int, default=8)
+    universo.add_argument("--years", type=int, default=3, help="anos de pregões diários")
+    universo.add_argument("--models", type=int, default=3)
+    universo.add_argument("--prediction-days", type=int, default=60)
+    universo.add_argument("--seed", type=int, default=42)
+
+    carga = parser.add_argument_group("carga (run)")
+    carga.add_argument("--requests", type=int, default=200, help="requisições por rota")
+    carga.add_argument("--concurrency", type=int, default=8)
+    carga.add_argument("--endpoints", nargs="+", choices=ROTAS, default=ROTAS)
+    carga.add_argument(
+        "--cold",
+        action="store_true",
+        help="sem snapshot nem company_comparisons, caches esvaziados antes de medir",
+    )
+    carga.add_argument("--url", help="API já em execução (senão sobe uma na --port)")
+    carga.add_argument("--port", type=int, default=BENCH_PORT)
+    carga.add_argument("--out", help="arquivo JSON de saída")
+    args = parser.parse_args()
+
+    if args.db == "tcc_b3" and args.command in ("seed", "all"):
+        parser.error("o seed recria o banco; use um banco próprio para o benchmark")
+    if args.cold and (args.url or args.db == "tcc_b3"):
+        parser.error("--cold sobe a própria API e renomeia company_comparisons: "
+                     "use um banco de benchmark e não passe --url")
+
+    universo = seed(args) if args.command in ("seed", "all") else None
+    if args.command in ("run", "all"):
+        run(args, universo)
+
+
+if __name__ == "__main__":
+    main()
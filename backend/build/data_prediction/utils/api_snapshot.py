@@ -0,0 +1,23 @@
+# data_prediction/utils/api_snapshot.py
+import sys
+import time
+from pathlib import Path
+
+# o snapshot é montado pelos próprios serviços da API (backend/services)
+BACKEND_DIR = Path(__file__).resolve().parents[3]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.append(str(BACKEND_DIR))
+
+from services.snapshot import write_snapshot  # noqa: E402
+
+
+def run_api_snapshot():
+    """Grava o snapshot dos payloads da API para a versão atual dos dados."""
+    inicio = time.time()
+    destino = write_snapshot()
+    print(f"📦 Snapshot da API gravado em {destino} ({time.time() - inicio:.2f} s)")
+    return destino
+
+
+if __name__ == "__main__":
+    run_api_snapshot()
@@ -0,0 +1,60 @@
+# data_prediction/utils/company_comparisons.py
+import sys
+import time
+from pathlib import Path
+
+from data_prediction.utils.connection import get_connection
+
+# os resumos são calculados pelos próprios serviços da API (backend/services)
+BACKEND_DIR = Path(__file__).resolve().parents[3]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.append(str(BACKEND_DIR))
+
+from services.cache import get_data_version  # noqa: E402
+from services.comparison_service import gerar_comparacoes  # noqa: E402
+from services.serialization import dumps  # noqa: E402
+
+# Payload de /comparison/{ticker} por empresa, pré-calculado a cada build;
+# a API só o usa se `version` for a versão atual dos dados.
+CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS company_comparisons (
+    b3_code     TEXT        PRIMARY KEY,
+    version     TEXT        NOT NULL,
+    payload     JSON        NOT NULL,
+    updated_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+GRANT SELECT ON company_comparisons TO compareter;
+"""
+
+COPY_COMPARISONS = "COPY company_comparisons (b3_code, version, payload) FROM STDIN"
+
+
+def run_company_comparisons():
+    """
+    Recalcula os resumos curto/longo (com acurácias) de todas as empresas
+    numa passada e regrava company_comparisons. Retorna o nº de empresas.
+    """
+    with get_connection() as conn:
+        version = get_data_version(conn)
+
+        inicio = time.time()
+        comparacoes = gerar_comparacoes(conn)
+        calculo = time.time() - inicio
+
+        with conn.cursor() as cur:
+            cur.execute(CREATE_TABLE)
+            cur.execute("DELETE FROM company_comparisons")
+            with cur.copy(COPY_COMPARISONS) as copy:
+                for ticker, payload in comparacoes.items():
+                    copy.write_row((ticker, version.token, dumps(payload).decode()))
+        conn.commit()
+
+    print(
+        f"📊 Comparações de {len(comparacoes)} empresas calculadas em {calculo:.2f} s "
+        f"(total {time.time() - inicio:.2f} s)."
+    )
+    return len(comparacoes)
+
+
+if __name__ == "__main__":
+    run_company_comparisons()
@@ -0,0 +1,25 @@
+# data_prediction/utils/connection.py
+import os
+
+from psycopg import connect
+
+
+def get_connection(
+    dbname=None,
+    user="postgres",
+    password="postgres",
+    host="localhost",
+    port="5432"
+):
+    """
+    Conexão dos passos de pós-processamento do build. O banco vem de
+    TCC_B3_DB (padrão tcc_b3), o mesmo que a API lê em config/db.py:
+    o load test aponta os dois para o banco sintético.
+    """
+    return connect(
+        dbname=dbname or os.environ.get("TCC_B3_DB", "tcc_b3"),
+        user=user,
+        password=password,
+        host=host,
+        port=port
+    )
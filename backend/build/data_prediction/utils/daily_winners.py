@@ -0,0 +1,87 @@
+# data_prediction/utils/daily_winners.py
+from data_prediction.utils.connection import get_connection
+
+# Melhor modelo por dia/papel (menor erro relativo contra o fechamento),
+# com o fechamento do pregão anterior já resolvido. Lido pelos serviços
+# de estatísticas no lugar do ROW_NUMBER() sobre predictions.
+CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS daily_winners (
+    date        DATE    NOT NULL,
+    b3_code_id  INTEGER NOT NULL,
+    model       TEXT    NOT NULL,
+    y_pred      NUMERIC,
+    y_true      NUMERIC,
+    prev_close  NUMERIC,
+    PRIMARY KEY (date, b3_code_id)
+);
+CREATE INDEX IF NOT EXISTS daily_winners_b3_code_id_idx
+    ON daily_winners (b3_code_id);
+GRANT SELECT ON daily_winners TO compareter;
+"""
+
+# Recalcula os pares (date, b3_code_id) das empresas informadas e os que
+# ainda não estão na tabela (ex.: previsões cujo preço real chegou agora).
+UPSERT_WINNERS = """
+INSERT INTO daily_winners (date, b3_code_id, model, y_pred, y_true, prev_close)
+SELECT DISTINCT ON (p.date, p.b3_code_id)
+       p.date,
+       p.b3_code_id,
+       m.model,
+       p.value,
+       ph.close,
+       prev.close
+FROM predictions      p
+JOIN models           m  ON m.id = p.model_id
+JOIN history_columns  hc ON hc.id = p.history_columns_id
+JOIN price_history    ph ON ph.company_id = p.b3_code_id
+                        AND ph.date      = p.date
+LEFT JOIN LATERAL (
+  SELECT pp.close
+  FROM price_history pp
+  WHERE pp.company_id = p.b3_code_id
+    AND pp.date       < p.date
+  ORDER BY pp.date DESC
+  LIMIT 1
+) prev ON TRUE
+WHERE hc.column_name ILIKE 'close'
+  AND (
+        %(todas)s
+     OR p.b3_code_id = ANY(%(empresas)s)
+     OR NOT EXISTS (
+          SELECT 1 FROM daily_winners w
+          WHERE w.date = p.date AND w.b3_code_id = p.b3_code_id
+        )
+  )
+ORDER BY p.date, p.b3_code_id, ABS(p.value - ph.close) / ph.close
+ON CONFLICT (date, b3_code_id) DO UPDATE SET
+    model      = EXCLUDED.model,
+    y_pred     = EXCLUDED.y_pred,
+    y_true     = EXCLUDED.y_true,
+    prev_close = EXCLUDED.prev_close;
+"""
+
+
+def refresh_daily_winners(company_ids=None):
+    """
+    Atualiza daily_winners de forma incremental.
+    company_ids=None recalcula todas as empresas (carga inicial).
+    Retorna o número de linhas inseridas/atualizadas.
+    """
+    ids = [int(c) for c in (company_ids or [])]
+
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(CREATE_TABLE)
+            cur.execute(
+                UPSERT_WINNERS,
+                {"todas": company_ids is None, "empresas": ids},
+            )
+            total = cur.rowcount
+        conn.commit()
+
+    print(f"🏆 daily_winners atualizada: {total} linhas.")
+    return total
+
+
+if __name__ == "__main__":
+    refresh_daily_winners()
@@ -0,0 +1,44 @@
+# data_prediction/utils/data_version.py
+from data_prediction.utils.connection import get_connection
+
+# Versão dos dados servidos pela API: uma única linha, incrementada pelo
+# build sempre que novas previsões são gravadas. A API usa o número como
+# ETag e como chave dos caches de resposta.
+CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS data_version (
+    id          SMALLINT    PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    version     BIGINT      NOT NULL,
+    updated_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+GRANT SELECT ON data_version TO compareter;
+"""
+
+BUMP_VERSION = """
+INSERT INTO data_version (id, version, updated_at)
+VALUES (1, 1, now())
+ON CONFLICT (id) DO UPDATE SET
+    version    = data_version.version + 1,
+    updated_at = now()
+RETURNING version;
+"""
+
+# a API escuta este canal e esvazia seus caches (services/cache.py)
+NOTIFY_VERSION = "SELECT pg_notify('data_version', %s)"
+
+
+def bump_data_version():
+    """Publica uma nova versão dos dados. Retorna o número da versão."""
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(CREATE_TABLE)
+            cur.execute(BUMP_VERSION)
+            (version,) = cur.fetchone()
+            cur.execute(NOTIFY_VERSION, (str(version),))
+        conn.commit()
+
+    print(f"🏷️ Versão dos dados: {version}")
+    return version
+
+
+if __name__ == "__main__":
+    bump_data_version()
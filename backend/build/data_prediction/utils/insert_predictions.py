@@ -2,7 +2,21 @@ import os
 from pathlib import Path
 import pandas as pd
 from psycopg import connect
+import requests
 import shutil
+from data_prediction.utils.daily_winners import refresh_daily_winners
+from data_prediction.utils.data_version import bump_data_version
+
+API_URL = "http://localhost:9000"
+
+
+def invalidar_cache_api():
+    """Avisa a API (se estiver rodando) que há novas previsões."""
+    try:
+        requests.post(f"{API_URL}/statistics/invalidate", timeout=5)
+        print("🔄 Cache de estatísticas da API invalidado.")
+    except requests.RequestException:
+        print("ℹ️ API não está rodando; cache será renovado pela versão dos dados.")
 
 def run_insert_predictions():
     # Caminho da pasta com os arquivos de previsão
@@ -26,6 +40,7 @@ def run_insert_predictions():
     def insert_all_predictions():
         arquivos = [f for f in os.listdir(PREDICTIONS_FOLDER) if f.endswith(".parquet")]
         print(f"\nEncontrados {len(arquivos)} arquivos para inserção.")
+        empresas_inseridas = set()
 
         for nome_arquivo in arquivos:
             caminho = os.path.join(PREDICTIONS_FOLDER, nome_arquivo)
@@ -57,6 +72,7 @@ def run_insert_predictions():
 
                         conn.commit()  # salva todas as válidas
 
+                empresas_inseridas.add(int(b3_code_id))
                 os.remove(caminho)
                 print(f"✅ Inserido com sucesso e deletado: {nome_arquivo}")
 
@@ -68,8 +84,13 @@ def run_insert_predictions():
             print(f"🗑️ Pasta removida: {PREDICTIONS_FOLDER}")
         else:
             print(f"⚠️ Pasta não encontrada para remoção: {PREDICTIONS_FOLDER}")
+
+        return empresas_inseridas
     # Executa a função principal
-    insert_all_predictions()
+    empresas_inseridas = insert_all_predictions()
+    refresh_daily_winners(empresas_inseridas)
+    bump_data_version()
+    invalidar_cache_api()
 
 if __name__ == "__main__":
     run_insert_predictions()
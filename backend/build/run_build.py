@@ -3,6 +3,8 @@ from data_prediction.get_data.run_get_data import run_get_data
 from data_prediction.utils.build_dataset import run_build_dataset
 from training.run_models import run_models
 from data_prediction.utils.insert_predictions import run_insert_predictions
+from data_prediction.utils.company_comparisons import run_company_comparisons
+from data_prediction.utils.api_snapshot import run_api_snapshot
 import time
 
 def run_build():
@@ -27,6 +29,12 @@ def run_build():
     # # Passo 5: Inserir previsões no banco de dados
     run_insert_predictions()
 
+    # # Passo 6: Pré-calcular comparações de todas as empresas
+    run_company_comparisons()
+
+    # # Passo 7: Snapshot dos payloads da API (warm start)
+    run_api_snapshot()
+
     print("✅ Processo de construção do banco de dados concluído.")
     end_time = time.time()
     elapsed_time = end_time - start_time
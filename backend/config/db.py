@@ -1,10 +1,157 @@
-import psycopg
+import os
+import threading
 
+from psycopg import AsyncConnection
+from psycopg.conninfo import make_conninfo
+from psycopg_pool import AsyncConnectionPool, ConnectionPool
 
-conn = psycopg.connect(
-    dbname="tcc_b3",
-    user="postgres",
-    password="postgres",  # troque se necessário
-    host="localhost",
-    port="5432"
-)
\ No newline at end of file
+from services.metrics import AsyncMeteredCursor, MeteredCursor
+
+
+DB_HOST = "localhost"
+DB_PORT = "5432"
+DB_NAME = os.environ.get("TCC_B3_DB", "tcc_b3")  # o load test usa outro banco
+DB_PASSWORD = "postgres"  # troque se necessário
+
+# Papel padrão (companies / sectors / prediction) e papel somente leitura
+# usado pelos serviços analíticos (comparison / statistics).
+# Defina READ_ONLY_USER = None para usar um único pool.
+DEFAULT_USER = "postgres"
+READ_ONLY_USER = "compareter"
+
+# Tamanho dos pools: min_size conexões ficam abertas; até max_size sob carga
+POOL_MIN_SIZE = 2
+POOL_MAX_SIZE = 10
+POOL_TIMEOUT = 30        # segundos esperando uma conexão livre
+POOL_MAX_IDLE = 600      # fecha conexões ociosas acima de min_size
+
+
+def _conninfo(user: str) -> str:
+    return make_conninfo(
+        dbname=DB_NAME,
+        user=user,
+        password=DB_PASSWORD,
+        host=DB_HOST,
+        port=DB_PORT,
+    )
+
+
+def _configure_read_only(conn):
+    """Conexões do pool de leitura nunca escrevem."""
+    conn.read_only = True
+
+
+def _make_pool(user: str, name: str, configure=None) -> ConnectionPool:
+    # aberto no primeiro uso (get_conn): importar os serviços não conecta
+    return ConnectionPool(
+        conninfo=_conninfo(user),
+        min_size=POOL_MIN_SIZE,
+        max_size=POOL_MAX_SIZE,
+        timeout=POOL_TIMEOUT,
+        max_idle=POOL_MAX_IDLE,
+        # health check a cada checkout: descarta conexões quebradas
+        check=ConnectionPool.check_connection,
+        configure=configure,
+        # toda consulta dos serviços passa pelo cursor instrumentado (/metrics)
+        kwargs={"cursor_factory": MeteredCursor},
+        name=name,
+        open=False,
+    )
+
+
+pool = _make_pool(DEFAULT_USER, "default")
+read_pool = (
+    _make_pool(READ_ONLY_USER, "read_only", configure=_configure_read_only)
+    if READ_ONLY_USER
+    else pool
+)
+
+
+_open_lock = threading.Lock()
+
+
+def _opened(p: ConnectionPool) -> ConnectionPool:
+    if p.closed:
+        with _open_lock:
+            if p.closed:
+                p.open()
+    return p
+
+
+def get_conn(readonly: bool = False):
+    """
+    Empresta uma conexão do pool (uso: ``with get_conn() as conn:``).
+    A conexão volta ao pool ao sair do bloco, com commit/rollback automático.
+    O pool é aberto na primeira chamada.
+    """
+    return _opened(read_pool if readonly else pool).connection()
+
+
+def close_pools():
+    """Fecha os pools (chamado no shutdown da API)."""
+    pool.close()
+    if read_pool is not pool:
+        read_pool.close()
+
+
+# ------------------------------------------------------------------
+# Pools assíncronos (rotas async def da API)
+# ------------------------------------------------------------------
+async def _configure_read_only_async(conn):
+    await conn.set_read_only(True)
+
+
+def _make_async_pool(user: str, name: str, configure=None) -> AsyncConnectionPool:
+    # aberto no startup da API (open_async_pools), dentro do event loop
+    return AsyncConnectionPool(
+        conninfo=_conninfo(user),
+        min_size=POOL_MIN_SIZE,
+        max_size=POOL_MAX_SIZE,
+        timeout=POOL_TIMEOUT,
+        max_idle=POOL_MAX_IDLE,
+        check=AsyncConnectionPool.check_connection,
+        configure=configure,
+        kwargs={"cursor_factory": AsyncMeteredCursor},
+        name=f"{name}_async",
+        open=False,
+    )
+
+
+async_pool = _make_async_pool(DEFAULT_USER, "default")
+async_read_pool = (
+    _make_async_pool(READ_ONLY_USER, "read_only", configure=_configure_read_only_async)
+    if READ_ONLY_USER
+    else async_pool
+)
+
+
+def get_async_conn(readonly: bool = False):
+    """Versão assíncrona de get_conn (uso: ``async with get_async_conn() as conn:``)."""
+    return (async_read_pool if readonly else async_pool).connection()
+
+
+async def fetch_all_async(query, params=None, readonly: bool = False):
+    """
+    Executa uma consulta numa conexão própria do pool e devolve as linhas.
+    Consultas independentes podem rodar em paralelo com asyncio.gather.
+    """
+    async with get_async_conn(readonly) as conn, conn.cursor() as cur:
+        await cur.execute(query, params)
+        return await cur.fetchall()
+
+
+async def connect_listener_async() -> AsyncConnection:
+    """Conexão dedicada (fora dos pools) para LISTEN/NOTIFY."""
+    return await AsyncConnection.connect(_conninfo(DEFAULT_USER), autocommit=True)
+
+
+async def open_async_pools():
+    await async_pool.open()
+    if async_read_pool is not async_pool:
+        await async_read_pool.open()
+
+
+async def close_async_pools():
+    await async_pool.close()
+    if async_read_pool is not async_pool:
+        await async_read_pool.close()
@@ -0,0 +1,90 @@
+from typing import Any, Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from fastapi import Request
+from fastapi.responses import Response
+
+from services.serialization import dumps
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+# respostas negociadas por Accept (JSON ou Arrow)
+VARY_ACCEPT = {"Vary": "Accept"}
+
+
+def wants_arrow(request: Request) -> bool:
+    """O cliente pediu Arrow IPC (stream) no cabeçalho Accept?"""
+    return ARROW_STREAM in request.headers.get("accept", "")
+
+
+def records_to_table(
+    records: List[Dict[str, Any]],
+    dates: Optional[Dict[str, str]] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+) -> pa.Table:
+    """
+    Lista de dicionários → tabela Arrow com colunas tipadas.
+    Chaves ausentes em alguns registros viram nulos; `dates` mapeia
+    coluna → formato strptime para convertê-la em date32; `metadata`
+    vai, em JSON, nos metadados do schema.
+    """
+    cols = list(dict.fromkeys(k for r in records for k in r))
+    table = pa.table({c: [r.get(c) for r in records] for c in cols})
+
+    for col, fmt in (dates or {}).items():
+        if col in table.column_names:
+            parsed = pc.strptime(table[col], format=fmt, unit="s").cast(pa.date32())
+            table = table.set_column(table.column_names.index(col), col, parsed)
+
+    if metadata:
+        table = table.replace_schema_metadata(
+            {k: dumps(v) for k, v in metadata.items()}
+        )
+    return table
+
+
+def prediction_to_arrow(payload: Dict[str, Any]) -> pa.Table:
+    """/prediction: graph como colunas; price/variation/updated_at nos metadados."""
+    return records_to_table(
+        payload["graph"],
+        dates={"date": "%d/%m/%Y"},
+        metadata={k: v for k, v in payload.items() if k != "graph"},
+    )
+
+
+def statistics_to_arrow(payload: Dict[str, Any]) -> pa.Table:
+    """
+    /statistics: winners gerais e do setor numa só tabela, separados
+    pela coluna `scope`; stats e sector_name nos metadados.
+    """
+    records = [
+        {"scope": scope, **w}
+        for scope in ("general", "sector")
+        for w in payload[scope]["winners"]
+    ]
+    table = records_to_table(
+        records,
+        dates={"date": "%Y-%m-%d"},
+        metadata={
+            scope: {k: v for k, v in payload[scope].items() if k != "winners"}
+            for scope in ("general", "sector")
+        },
+    )
+    if records:
+        table = table.set_column(
+            0, "scope", pc.dictionary_encode(table["scope"])
+        )
+    return table
+
+
+class ArrowStreamResponse(Response):
+    """Resposta em formato Arrow IPC (stream) a partir de uma pa.Table."""
+
+    media_type = ARROW_STREAM
+
+    def render(self, content: pa.Table) -> bytes:
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, content.schema) as writer:
+            writer.write_table(content)
+        return sink.getvalue().to_pybytes()
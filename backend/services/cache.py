@@ -0,0 +1,250 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Hashable, NamedTuple, Optional, Tuple
+
+from psycopg import errors
+
+from config.db import connect_listener_async, fetch_all_async, get_conn
+from services.dimensions import dimensions
+
+# versão publicada pelo build (data_prediction/utils/data_version.py)
+DATA_VERSION_SQL = "SELECT version::text, updated_at FROM data_version"
+
+# bancos ainda sem data_version: sonda sobre predictions
+FALLBACK_VERSION_SQL = """
+    SELECT count(*) || '-' || coalesce(extract(epoch FROM max(updated_at))::bigint, 0),
+           max(updated_at)
+    FROM predictions
+"""
+
+
+# limites do cache de respostas por ticker (/prediction, /comparison)
+TICKER_CACHE_MAX_ENTRIES = 512
+TICKER_CACHE_MAX_BYTES = 64 * 1024 * 1024
+TICKER_CACHE_TTL = 3600  # segundos; o build invalida antes disso
+
+# canal em que o build avisa uma nova versão (NOTIFY data_version)
+DATA_VERSION_CHANNEL = "data_version"
+
+
+# ------------------------------------------------------------------
+# Versão dos dados
+# ------------------------------------------------------------------
+class DataVersion(NamedTuple):
+    """Token da versão (ETag / chave de cache) e quando foi publicada."""
+
+    token: str
+    updated_at: Optional[datetime]
+
+
+def _data_version(row) -> DataVersion:
+    token, updated_at = row
+    if updated_at is not None:
+        # predictions.updated_at não tem fuso; data_version vem no fuso da sessão
+        updated_at = (
+            updated_at.replace(tzinfo=timezone.utc)
+            if updated_at.tzinfo is None
+            else updated_at.astimezone(timezone.utc)
+        )
+    return DataVersion(token, updated_at)
+
+
+def get_data_version(conn=None) -> DataVersion:
+    """
+    Sonda barata da versão dos dados: uma linha de data_version, que o
+    build incrementa ao gravar novas previsões.
+    """
+    with (nullcontext(conn) if conn else get_conn(readonly=True)) as conn:
+        try:
+            with conn.transaction(), conn.cursor() as cur:
+                cur.execute(DATA_VERSION_SQL)
+                row = cur.fetchone()
+        except errors.UndefinedTable:
+            row = None
+        if row is None:
+            with conn.cursor() as cur:
+                cur.execute(FALLBACK_VERSION_SQL)
+                row = cur.fetchone()
+        return _data_version(row)
+
+
+async def get_data_version_async() -> DataVersion:
+    """Versão assíncrona de get_data_version."""
+    try:
+        rows = await fetch_all_async(DATA_VERSION_SQL, readonly=True)
+    except errors.UndefinedTable:
+        rows = []
+    if not rows:
+        rows = await fetch_all_async(FALLBACK_VERSION_SQL, readonly=True)
+    return _data_version(rows[0])
+
+
+# ------------------------------------------------------------------
+# Cache versionado
+# ------------------------------------------------------------------
+class VersionedCache:
+    """
+    Guarda resultados por chave junto com a versão dos dados em que
+    foram calculados; recalcula só quando a versão muda ou após
+    invalidate().
+    """
+
+    def __init__(self, version_fn: Callable[[], Hashable] = get_data_version):
+        self._version_fn = version_fn
+        self._entries: Dict[Hashable, Tuple[Hashable, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Any],
+        version: Optional[Hashable] = None,
+    ) -> Any:
+        """`version` evita nova sonda quando o chamador já a consultou."""
+        if version is None:
+            version = self._version_fn()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        value = compute()
+        with self._lock:
+            self._entries[key] = (version, value)
+        return value
+
+    async def aget_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Awaitable[Any]],
+        version: Hashable,
+    ) -> Any:
+        """Versão assíncrona; a versão já vem sondada pelo chamador."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        value = await compute()
+        with self._lock:
+            self._entries[key] = (version, value)
+        return value
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# agregados globais: estatísticas gerais ("general"), por setor
+# (("sector", id)), de todos os setores ("all_sectors"), acurácias
+# da comparação ("acuracias") e blocos já serializados do dashboard
+# (("json", chave))
+aggregates_cache = VersionedCache()
+
+
+# ------------------------------------------------------------------
+# Cache LRU com TTL (respostas por ticker)
+# ------------------------------------------------------------------
+class TTLCache:
+    """
+    LRU de respostas já serializadas (bytes), com validade `ttl` e
+    limitado tanto em número de entradas quanto em bytes.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = TICKER_CACHE_MAX_ENTRIES,
+        max_bytes: int = TICKER_CACHE_MAX_BYTES,
+        ttl: float = TICKER_CACHE_TTL,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(
+            ("hits", "misses", "expired", "evicted", "flushes"), 0
+        )
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                self._remove(key)
+                self._counters["expired"] += 1
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return value
+
+    def set(self, key: Hashable, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._bytes += len(value)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._counters["evicted"] += 1
+
+    def _remove(self, key: Hashable) -> None:
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._counters["flushes"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            consultas = self._counters["hits"] + self._counters["misses"]
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                **self._counters,
+                "hit_rate": round(self._counters["hits"] / consultas, 4) if consultas else None,
+            }
+
+
+# respostas de /prediction e /comparison por (endpoint, ticker, ...)
+ticker_cache = TTLCache()
+
+
+def invalidate_all() -> None:
+    """Esvazia todos os caches de dados (nova versão publicada pelo build)."""
+    aggregates_cache.invalidate()
+    ticker_cache.invalidate()
+    dimensions.invalidate()
+
+
+async def listen_data_version() -> None:
+    """
+    Escuta NOTIFY data_version (enviado pelo build) e esvazia os caches
+    a cada nova versão. Reconecta se o banco cair; roda até ser cancelada.
+    """
+    while True:
+        try:
+            async with await connect_listener_async() as conn:
+                await conn.execute(f"LISTEN {DATA_VERSION_CHANNEL}")
+                invalidate_all()  # pode ter perdido avisos enquanto desconectado
+                async for _ in conn.notifies():
+                    invalidate_all()
+        except errors.OperationalError:
+            await asyncio.sleep(5)
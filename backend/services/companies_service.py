@@ -1,32 +1,18 @@
-from config.db import conn
+from services.company_search import buscar_empresas
+from services.dimensions import dimensions
 
 
-def get_companies_from_db(): 
+async def get_companies_from_db_async(version=None, sector=None):
     """
-    Função para obter as empresas da base de dados.
+    Empresas (opcionalmente de um setor), servidas pelo índice de
+    dimensões em memória.
     """
-    with conn.cursor() as cursor:
-        cursor.execute("""
-            SELECT 
-                c.b3_code ticker, 
-                c.name,
-                s.name sector,
-                c.sector_id       
-            FROM 
-                companies c
-            JOIN 
-                sectors s ON c.sector_id = s.id
-        """)
-        rows = cursor.fetchall()
-        companies = [
-            {
-                "ticker": row[0],
-                "name": row[1],
-                "sector": row[2],
-                "sector_id": row[3]
-            }
-            for row in rows
-        ]
+    companies = (await dimensions.aget(version)).companies
+    if sector is not None:
+        companies = [c for c in companies if c["sector"] == sector]
+    return companies
 
-        
-    return companies
\ No newline at end of file
+
+async def search_companies_async(q, limit=10, version=None):
+    """Empresas cujo ticker/nome casa com `q` (índice em memória)."""
+    return buscar_empresas(await dimensions.aget(version), q, limit)
@@ -0,0 +1,137 @@
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from services.dimensions import Dimensoes
+
+# Faixas de relevância (menor = melhor)
+TICKER_EXATO = 0
+TICKER_PREFIXO = 1
+NOME_PREFIXO = 2       # nome completo ou alguma palavra do nome
+SUBSTRING = 3          # trecho no meio do ticker/nome
+PARECIDO = 4           # erro de digitação (similaridade de trigramas)
+
+SIMILARIDADE_MINIMA = 0.3
+# consultas mais curtas não formam trigramas úteis: varredura simples
+TRECHO_MINIMO = 3
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas, sem acentos e só com letras/dígitos separados por espaço."""
+    sem_acento = "".join(
+        c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c)
+    )
+    return " ".join(re.findall(r"[0-9a-z]+", sem_acento.casefold()))
+
+
+def _trigramas(texto: str) -> Set[str]:
+    texto = f"  {texto} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class CompanySearchIndex:
+    """
+    Índice de busca de empresas por ticker e nome, montado uma vez a
+    partir das dimensões: lista ordenada de termos para busca por
+    prefixo (bisect) e trigramas para trechos e erros de digitação.
+    """
+
+    def __init__(self, dims: Dimensoes):
+        self.dims = dims
+        self.empresas = dims.companies
+        self._chaves: List[str] = []           # "ticker nome" normalizado
+        self._tris_nome: List[List[Set[str]]] = []  # nome inteiro e cada palavra
+        termos: List[Tuple[str, int, int]] = []  # (termo, faixa, empresa)
+        self._trigramas: Dict[str, Set[int]] = defaultdict(set)
+
+        for i, empresa in enumerate(self.empresas):
+            ticker = normalizar(empresa["ticker"])
+            nome = normalizar(empresa["name"])
+            chave = f"{ticker} {nome}"
+            self._chaves.append(chave)
+            self._tris_nome.append(
+                [_trigramas(nome)] + [_trigramas(p) for p in nome.split()[1:]]
+            )
+
+            termos.append((ticker.replace(" ", ""), TICKER_PREFIXO, i))
+            termos.append((nome, NOME_PREFIXO, i))
+            termos += [(palavra, NOME_PREFIXO, i) for palavra in nome.split()[1:]]
+            for tri in _trigramas(chave):
+                self._trigramas[tri].add(i)
+
+        termos.sort()
+        self._termos = [t[0] for t in termos]
+        self._faixas = [(t[1], t[2]) for t in termos]
+
+    def _prefixo(self, q: str, melhores: Dict[int, Tuple[int, float]]) -> None:
+        compacto = q.replace(" ", "")
+        for alvo in {q, compacto}:
+            pos = bisect_left(self._termos, alvo)
+            while pos < len(self._termos) and self._termos[pos].startswith(alvo):
+                faixa, i = self._faixas[pos]
+                if faixa == TICKER_PREFIXO and self._termos[pos] in (
+                    compacto,
+                    compacto + "sa",  # "petr4" == "PETR4.SA"
+                ):
+                    faixa = TICKER_EXATO
+                if faixa < melhores.get(i, (PARECIDO + 1,))[0]:
+                    melhores[i] = (faixa, 0.0)
+                pos += 1
+
+    def _por_trecho(self, q: str, melhores: Dict[int, Tuple[int, float]]) -> None:
+        """Consultas curtas ("3", "pe"): trecho em qualquer ponto do ticker/nome."""
+        for i, chave in enumerate(self._chaves):
+            if i not in melhores and q in chave:
+                melhores[i] = (SUBSTRING, 0.0)
+
+    def _por_trigramas(self, q: str, melhores: Dict[int, Tuple[int, float]]) -> None:
+        tris = _trigramas(q)
+        candidatas: Set[int] = set()  # ao menos um trigrama em comum
+        for tri in tris:
+            candidatas |= self._trigramas.get(tri, set())
+
+        for i in candidatas:
+            if i in melhores:
+                continue
+            if q in self._chaves[i]:
+                melhores[i] = (SUBSTRING, 0.0)
+                continue
+            # contra o nome e cada palavra: "unibnaco" ~ "unibanco" em "itau unibanco"
+            similaridade = max(
+                len(tris & alvo) / len(tris | alvo) for alvo in self._tris_nome[i]
+            )
+            if similaridade >= SIMILARIDADE_MINIMA:
+                melhores[i] = (PARECIDO, -similaridade)
+
+    def buscar(self, q: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Empresas que casam com `q`, das mais às menos relevantes."""
+        q = normalizar(q)
+        if not q:
+            return []
+
+        melhores: Dict[int, Tuple[int, float]] = {}
+        self._prefixo(q, melhores)
+        if len(melhores) < limit:
+            if len(q) < TRECHO_MINIMO:
+                self._por_trecho(q, melhores)
+            else:
+                self._por_trigramas(q, melhores)
+
+        ordem = sorted(
+            melhores,
+            key=lambda i: (*melhores[i], len(self.empresas[i]["ticker"]), self._chaves[i]),
+        )
+        return [self.empresas[i] for i in ordem[:limit]]
+
+
+_indice: Optional[CompanySearchIndex] = None
+
+
+def buscar_empresas(dims: Dimensoes, q: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """Busca no índice das dimensões atuais (remonta se elas mudaram)."""
+    global _indice
+    if _indice is None or _indice.dims is not dims:
+        _indice = CompanySearchIndex(dims)
+    return _indice.buscar(q, limit)
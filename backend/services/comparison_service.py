@@ -1,22 +1,82 @@
-import psycopg
+import asyncio
+import numpy as np
 import pandas as pd
+from psycopg import errors, sql
+from config.db import fetch_all_async, get_conn
+from services.cache import aggregates_cache, get_data_version_async
+from services.dimensions import dimensions
+from services.metrics import medir_pandas
+from services.serialization import frame_to_records
 
 # ----------------------------------------------------------------------
 # 1) Conexão ----------------------------------------------------------------
 # ----------------------------------------------------------------------
 def get_connection():
-    """Retorna uma conexão psycopg já configurada."""
-    return psycopg.connect(
-        dbname="tcc_b3",
-        user="compareter",
-        password="postgres",
-        host="localhost",
-        port="5432"
-    )
+    """Empresta uma conexão do pool somente leitura."""
+    return get_conn(readonly=True)
 
 # ----------------------------------------------------------------------
 # 2) Utilitários de price_history --------------------------------------
 # ----------------------------------------------------------------------
+PRICE_LOOKUP_SQL = sql.SQL(
+    """
+    SELECT k.date,
+           k.company_id,
+           ph.{col},
+           ant.{col}
+    FROM unnest(%s::date[], %s::int[]) AS k(date, company_id)
+    LEFT JOIN price_history ph
+           ON ph.date       = k.date
+          AND ph.company_id = k.company_id
+    LEFT JOIN LATERAL (
+        SELECT p2.{col}
+        FROM price_history p2
+        WHERE p2.company_id = k.company_id
+          AND p2.date       < k.date
+        ORDER BY p2.date DESC
+        LIMIT 1
+    ) ant ON TRUE
+    """
+)
+
+
+def _lotes_preco(df):
+    """
+    Uma consulta por coluna de histórico (LATERAL join sobre os pares
+    date/b3_code_id distintos): gera (índices, consulta, parâmetros).
+    """
+    if df.empty:
+        return
+    cols = df["history_column_name"].str.lower().to_numpy()
+    datas = df["date"].to_numpy()
+    empresas = df["b3_code_id"].to_numpy()
+
+    for col in pd.unique(cols):
+        idx = (cols == col).nonzero()[0]
+        chaves = list(dict.fromkeys(zip(datas[idx], empresas[idx])))
+        yield (
+            idx,
+            PRICE_LOOKUP_SQL.format(col=sql.Identifier(col)),
+            ([c[0] for c in chaves], [int(c[1]) for c in chaves]),
+        )
+
+
+def _distribuir_precos(df, resultados):
+    """(índices, linhas) de cada lote → listas atual/anterior na ordem do df."""
+    atual = [None] * len(df)
+    anterior = [None] * len(df)
+    datas = df["date"].to_numpy()
+    empresas = df["b3_code_id"].to_numpy()
+
+    for idx, rows in resultados:
+        valores = {(r[0], r[1]): (r[2], r[3]) for r in rows}
+        for i in idx:
+            atual[i], anterior[i] = valores.get(
+                (datas[i], empresas[i]), (None, None)
+            )
+    return atual, anterior
+
+
 def fetch_price_history_columns(conn, df):
     """
     Para cada linha do DataFrame, busca:
@@ -24,82 +84,78 @@ def fetch_price_history_columns(conn, df):
       • price_history_value_anterior (data imediatamente anterior)
     Retorna duas listas na ordem do DataFrame.
     """
-    atual, anterior = [], []
-
+    resultados = []
     with conn.cursor() as cur:
-        for _, row in df.iterrows():
-            col = row["history_column_name"].lower()
-
-            # valor atual
-            cur.execute(
-                f"""SELECT ph."{col}"
-                    FROM price_history ph
-                    WHERE ph.date = %s AND ph.company_id = %s""",
-                (row["date"], row["b3_code_id"]),
-            )
-            atual.append((cur.fetchone() or [None])[0])
-
-            # valor anterior
-            cur.execute(
-                f"""SELECT ph."{col}"
-                    FROM price_history ph
-                    WHERE ph.date < %s AND ph.company_id = %s
-                    ORDER BY ph.date DESC
-                    LIMIT 1""",
-                (row["date"], row["b3_code_id"]),
-            )
-            anterior.append((cur.fetchone() or [None])[0])
+        for idx, query, params in _lotes_preco(df):
+            cur.execute(query, params)
+            resultados.append((idx, cur.fetchall()))
+    return _distribuir_precos(df, resultados)
 
-    return atual, anterior
+
+async def fetch_price_history_columns_async(df):
+    """Versão assíncrona: as consultas de cada coluna rodam em paralelo."""
+    lotes = list(_lotes_preco(df))
+    linhas = await asyncio.gather(
+        *(fetch_all_async(query, params, readonly=True) for _, query, params in lotes)
+    )
+    return _distribuir_precos(
+        df, [(idx, rows) for (idx, _, _), rows in zip(lotes, linhas)]
+    )
 
 # ----------------------------------------------------------------------
 # 3) Dados de uma empresa (curto / longo / vencedores) -----------------
 # ----------------------------------------------------------------------
+PREDICTION_COLUMNS = [
+    "date",
+    "model_name",
+    "value",
+    "company_name",
+    "history_column_name",
+    "history_columns_id",
+    "b3_code_id",
+]
+
+# previsões das 9 datas mais recentes da empresa (o nome vem do índice
+# de dimensões, sem join com companies)
+COMPANY_PREDICTIONS_SQL = """
+    SELECT
+        p.date,
+        m.model AS model_name,
+        p.value,
+        hc.column_name AS history_column_name,
+        p.history_columns_id,
+        p.b3_code_id
+    FROM predictions p
+    JOIN models          m  ON p.model_id          = m.id
+    JOIN history_columns hc ON p.history_columns_id = hc.id
+    WHERE p.b3_code_id = %(company_id)s
+      AND p.date IN (
+          SELECT DISTINCT date
+          FROM predictions
+          WHERE b3_code_id = %(company_id)s
+          ORDER BY date DESC
+          LIMIT 9
+      )
+    ORDER BY p.date DESC
+"""
+
+
+@medir_pandas("comparison")
+def _frame_empresa(rows, company_name):
+    """Linhas de COMPANY_PREDICTIONS_SQL → DataFrame com PREDICTION_COLUMNS."""
+    df = pd.DataFrame(
+        rows, columns=[c for c in PREDICTION_COLUMNS if c != "company_name"]
+    )
+    df.insert(PREDICTION_COLUMNS.index("company_name"), "company_name", company_name)
+    return df
+
+
 def load_company_predictions(conn, company_id):
     """Carrega as 9 datas mais recentes da empresa + dados auxiliares."""
+    company_name = dimensions.get(conn=conn).empresa_nome.get(company_id)
     with conn.cursor() as cur:
-        cur.execute(
-            """
-            SELECT DISTINCT date
-            FROM predictions
-            WHERE b3_code_id = %s
-            ORDER BY date DESC
-            LIMIT 9
-            """,
-            (company_id,),
-        )
-        ultimas_datas = [r[0] for r in cur.fetchall()]
-
-        cur.execute(
-            """
-            SELECT
-                p.date,
-                m.model AS model_name,
-                p.value,
-                c.name  AS company_name,
-                hc.column_name AS history_column_name,
-                p.history_columns_id,
-                p.b3_code_id
-            FROM predictions p
-            JOIN models          m  ON p.model_id          = m.id
-            JOIN companies       c  ON p.b3_code_id        = c.id
-            JOIN history_columns hc ON p.history_columns_id = hc.id
-            WHERE p.b3_code_id = %s
-              AND p.date = ANY(%s)
-            ORDER BY p.date DESC
-            """,
-            (company_id, ultimas_datas),
-        )
-        cols = [
-            "date",
-            "model_name",
-            "value",
-            "company_name",
-            "history_column_name",
-            "history_columns_id",
-            "b3_code_id",
-        ]
-        return pd.DataFrame(cur.fetchall(), columns=cols)
+        cur.execute(COMPANY_PREDICTIONS_SQL, {"company_id": company_id})
+        return _frame_empresa(cur.fetchall(), company_name)
 
 
 def calcular_metricas(df):
@@ -117,12 +173,35 @@ def calcular_metricas(df):
     return df.sort_values(["date", "model_name"]).reset_index(drop=True)
 
 
-def gerar_resumos_empresa(conn, company_id):
-    """Retorna df da empresa, vencedores/dia, curto, longo."""
-    df = load_company_predictions(conn, company_id)
+def gerar_resumos_empresa(conn, company_id, df=None):
+    """
+    Retorna df da empresa, vencedores/dia, curto, longo.
+    `df` permite reaproveitar previsões já carregadas (mesmo formato de
+    load_company_predictions).
+    """
+    if df is None:
+        df = load_company_predictions(conn, company_id)
 
-    # Preenche price_history
     at, ant = fetch_price_history_columns(conn, df)
+    return resumir_empresa(df, at, ant)
+
+
+async def gerar_resumos_empresa_async(company_id):
+    """Versão assíncrona de gerar_resumos_empresa."""
+    rows = await fetch_all_async(
+        COMPANY_PREDICTIONS_SQL, {"company_id": company_id}, readonly=True
+    )
+    nome = (await dimensions.aget()).empresa_nome.get(company_id)
+    # pandas fora do event loop; só as consultas ficam nele
+    df = await asyncio.to_thread(_frame_empresa, rows, nome)
+    at, ant = await fetch_price_history_columns_async(df)
+    return await asyncio.to_thread(resumir_empresa, df, at, ant)
+
+
+@medir_pandas("comparison")
+def resumir_empresa(df, at, ant):
+    """Preenche price_history e calcula vencedores/dia, curto e longo."""
+    # Preenche price_history
     df["price_history_value"] = at
     df["price_history_value_anterior"] = ant
     df = df[df["price_history_value"].notnull()].reset_index(drop=True)
@@ -163,80 +242,217 @@ def load_all_predictions(conn):
             ORDER BY p.b3_code_id, p.date DESC
             """
         )
-        cols = [
-            "date",
-            "model_name",
-            "value",
-            "company_name",
-            "history_column_name",
-            "history_columns_id",
-            "b3_code_id",
-        ]
-        return pd.DataFrame(cur.fetchall(), columns=cols)
+        return pd.DataFrame(cur.fetchall(), columns=PREDICTION_COLUMNS)
 
 
 def adicionar_variancias(df):
     """Adiciona variance_prediction, real_variance, variance_accuracy."""
     # valor de referência (primeira price_history_value_anterior por empresa)
-    ref_dict = (
+    ref = (
         df.groupby("b3_code_id")["price_history_value_anterior"]
-        .first()
-        .to_dict()
+        .transform("first")
+        .to_numpy()
     )
+    ok = pd.notna(ref)
 
-    def _calc(row):
-        ref = ref_dict.get(row["b3_code_id"])
-        if pd.isna(ref):
-            return pd.Series([None, None, None])
-        pred = "up" if row["value"] - ref >= 0 else "down"
-        real = "up" if row["price_history_value"] - ref >= 0 else "down"
-        return pd.Series([pred, real, pred == real])
+    pred = np.full(len(df), None, dtype=object)
+    real = np.full(len(df), None, dtype=object)
+    acc = np.full(len(df), None, dtype=object)
 
-    df[["variance_prediction", "real_variance", "variance_accuracy"]] = (
-        df.apply(_calc, axis=1)
-    )
+    pred_up = (df["value"].to_numpy()[ok] - ref[ok]) >= 0
+    real_up = (df["price_history_value"].to_numpy()[ok] - ref[ok]) >= 0
+    pred[ok] = np.where(pred_up, "up", "down")
+    real[ok] = np.where(real_up, "up", "down")
+    acc[ok] = (pred_up == real_up).tolist()
+
+    df["variance_prediction"] = pred
+    df["real_variance"] = real
+    df["variance_accuracy"] = acc
     return df
 
 
+def _percentuais(contagens, chave):
+    """
+    Contagens por grupo (total, acertos, tot_up, up_ok, tot_dn, dn_ok)
+    → percentuais de acurácia arredondados como no cálculo original.
+    """
+    def _pct(ok, tot):
+        return pd.Series(
+            [round(o / t * 100, 2) if t else None
+             for o, t in zip(contagens[ok].tolist(), contagens[tot].tolist())],
+            dtype=float,
+        )
+
+    return pd.DataFrame({
+        chave: contagens[chave].to_numpy(),
+        "up_accuracy_percent": _pct("up_ok", "tot_up"),
+        "down_accuracy_percent": _pct("dn_ok", "tot_dn"),
+        "geral_accuracy_percent": _pct("acertos", "total"),
+    })
+
+
 def calcular_acuracias(df):
     """Gera dois DataFrames: acertos por modelo e por data."""
     base = df.dropna(subset=["variance_accuracy"])
 
-    def _agg(group):
-        total = len(group)
-        total_acertos = group["variance_accuracy"].sum()
-        geral = round(total_acertos / total * 100, 2) if total else None
+    pred = base["variance_prediction"].to_numpy()
+    acerto = base["real_variance"].to_numpy() == pred
+    up = pred == "up"
+    dn = pred == "down"
+    flags = pd.DataFrame({
+        "model_name": base["model_name"].to_numpy(),
+        "date": base["date"].to_numpy(),
+        "total": 1,
+        "acertos": base["variance_accuracy"].to_numpy(dtype=bool),
+        "tot_up": up,
+        "up_ok": up & acerto,
+        "tot_dn": dn,
+        "dn_ok": dn & acerto,
+    })
+
+    def _agg(chave):
+        contagens = (
+            flags.drop(columns=["model_name", "date"])
+            .groupby(flags[chave])
+            .sum()
+            .reset_index()
+        )
+        return _percentuais(contagens, chave)
 
-        # up/down
-        tot_up = len(group[group["variance_prediction"] == "up"]);
-        tot_dn = len(group[group["variance_prediction"] == "down"]);
+    return _agg("model_name"), _agg("date")
 
-        up_ok = len(
-            group[
-                (group["variance_prediction"] == "up")
-                & (group["variance_prediction"] == group["real_variance"])
-            ]
-        )
-        dn_ok = len(
-            group[
-                (group["variance_prediction"] == "down")
-                & (group["variance_prediction"] == group["real_variance"])
-            ]
+
+# Colunas de price_history referenciadas pelas previsões
+HISTORY_COLUMNS_SQL = """
+    SELECT DISTINCT lower(hc.column_name)
+    FROM history_columns hc
+    WHERE EXISTS (
+        SELECT 1 FROM predictions p
+        WHERE p.history_columns_id = hc.id
+    )
+"""
+
+ACURACIAS_SQL = sql.SQL(
+    """
+    WITH base AS (
+        SELECT p.date,
+               m.model AS model_name,
+               p.value,
+               p.b3_code_id,
+               {atual}    AS atual,
+               {anterior} AS anterior
+        FROM predictions p
+        JOIN models          m  ON p.model_id          = m.id
+        JOIN companies       c  ON p.b3_code_id        = c.id
+        JOIN history_columns hc ON p.history_columns_id = hc.id
+        LEFT JOIN price_history ph
+               ON ph.date       = p.date
+              AND ph.company_id = p.b3_code_id
+        LEFT JOIN LATERAL (
+            SELECT *
+            FROM price_history p2
+            WHERE p2.company_id = p.b3_code_id
+              AND p2.date       < p.date
+            ORDER BY p2.date DESC
+            LIMIT 1
+        ) ant ON TRUE
+    ),
+    validas AS (
+        SELECT * FROM base WHERE atual IS NOT NULL
+    ),
+    referencia AS (      -- anterior da data mais recente de cada empresa
+        SELECT DISTINCT ON (b3_code_id) b3_code_id, anterior AS ref
+        FROM validas
+        WHERE anterior IS NOT NULL
+        ORDER BY b3_code_id, date DESC
+    ),
+    direcoes AS (
+        SELECT v.model_name,
+               v.date,
+               v.value - r.ref >= 0 AS pred_up,
+               v.atual - r.ref >= 0 AS real_up
+        FROM validas v
+        JOIN referencia r USING (b3_code_id)
+    )
+    SELECT GROUPING(model_name) = 0 AS por_modelo,
+           model_name,
+           date,
+           count(*)                                          AS total,
+           count(*) FILTER (WHERE pred_up = real_up)         AS acertos,
+           count(*) FILTER (WHERE pred_up)                   AS tot_up,
+           count(*) FILTER (WHERE pred_up AND real_up)       AS up_ok,
+           count(*) FILTER (WHERE NOT pred_up)               AS tot_dn,
+           count(*) FILTER (WHERE NOT pred_up AND NOT real_up) AS dn_ok
+    FROM direcoes
+    GROUP BY GROUPING SETS ((model_name), (date))
+"""
+)
+
+
+def _acuracias_query(cols):
+    """ACURACIAS_SQL com price_history."<coluna>" de cada linha via CASE."""
+    def _valor(alias):
+        return sql.SQL("CASE lower(hc.column_name) {} END").format(
+            sql.SQL(" ").join(
+                sql.SQL("WHEN {} THEN {}.{}").format(
+                    sql.Literal(col), sql.Identifier(alias), sql.Identifier(col)
+                )
+                for col in cols
+            )
         )
 
-        up_acc = round(up_ok / tot_up * 100, 2) if tot_up else None
-        dn_acc = round(dn_ok / tot_dn * 100, 2) if tot_dn else None
-        return pd.Series({
-            "up_accuracy_percent": up_acc,
-            "down_accuracy_percent": dn_acc,
-            "geral_accuracy_percent": geral,
-        })
+    return ACURACIAS_SQL.format(atual=_valor("ph"), anterior=_valor("ant"))
+
 
-    acertos_modelo = base.groupby("model_name").apply(_agg).reset_index()
-    acertos_data = base.groupby("date").apply(_agg).reset_index()
+@medir_pandas("comparison")
+def _acuracias_de_contagens(rows):
+    """Linhas de ACURACIAS_SQL → (acertos_modelo, acertos_data)."""
+    if not rows:
+        vazio = ["up_accuracy_percent", "down_accuracy_percent",
+                 "geral_accuracy_percent"]
+        return (pd.DataFrame(columns=["model_name", *vazio]),
+                pd.DataFrame(columns=["date", *vazio]))
+
+    contagens = pd.DataFrame(
+        rows,
+        columns=["por_modelo", "model_name", "date", "total", "acertos",
+                 "tot_up", "up_ok", "tot_dn", "dn_ok"],
+    )
+    por_modelo = contagens[contagens["por_modelo"]]
+    por_data = contagens[~contagens["por_modelo"]]
+
+    acertos_modelo = _percentuais(
+        por_modelo.sort_values("model_name"), "model_name"
+    )
+    acertos_data = _percentuais(por_data.sort_values("date"), "date")
     return acertos_modelo, acertos_data
 
 
+def carregar_acuracias(conn):
+    """
+    Mesmo resultado de load_all_predictions + fetch_price_history_columns
+    + adicionar_variancias + calcular_acuracias, mas agregado no Postgres:
+    só as contagens por modelo e por data saem do banco.
+    """
+    with conn.cursor() as cur:
+        cur.execute(HISTORY_COLUMNS_SQL)
+        cols = [r[0] for r in cur.fetchall()]
+        if not cols:
+            return _acuracias_de_contagens([])
+
+        cur.execute(_acuracias_query(cols))
+        return _acuracias_de_contagens(cur.fetchall())
+
+
+async def carregar_acuracias_async():
+    """Versão assíncrona de carregar_acuracias."""
+    cols = [r[0] for r in await fetch_all_async(HISTORY_COLUMNS_SQL, readonly=True)]
+    rows = (
+        await fetch_all_async(_acuracias_query(cols), readonly=True) if cols else []
+    )
+    return await asyncio.to_thread(_acuracias_de_contagens, rows)
+
+
 def anexar_acuracias(df_base, acc_model, acc_date):
     """Adiciona colunas de acurácia do modelo e da data."""
     acc_model = acc_model.rename(
@@ -269,31 +485,56 @@ def comparar_dados_empresa(ticker: str):
     """
 
     with get_connection() as conn:
-        # ----- busca id da empresa
-        with conn.cursor() as cur:
-            cur.execute(
-                "SELECT id FROM companies WHERE b3_code = %s", (ticker,)
-            )
-            company_id = (cur.fetchone() or [None])[0]
+        # ----- id da empresa (índice em memória)
+        company_id = dimensions.get(conn=conn).ticker_id.get(ticker)
 
-    with get_connection() as conn:
         # ----- empresa específica
         df_emp, vencedores_emp, curto_emp, longo_emp = gerar_resumos_empresa(
             conn, company_id
         )
 
-        # ----- dataset geral + variâncias
-        df_all = load_all_predictions(conn)
-        at, ant = fetch_price_history_columns(conn, df_all)
-        df_all["price_history_value"] = at
-        df_all["price_history_value_anterior"] = ant
-        df_all = df_all[df_all["price_history_value"].notnull()].reset_index(drop=True)
-        df_all = adicionar_variancias(df_all)  # adiciona variance_* e accuracy
+        # ----- acurácias globais (agregadas no banco, em cache)
+        acc_model, acc_date = acuracias_globais(conn)
+
+    return montar_comparacao(curto_emp, longo_emp, acc_model, acc_date)
+
+
+async def comparar_dados_empresa_async(ticker: str, version=None):
+    """
+    Versão assíncrona de comparar_dados_empresa: dados da empresa e
+    acurácias globais são buscados ao mesmo tempo. `version` evita nova
+    sonda quando o chamador já a consultou.
+    """
+    company_id = (await dimensions.aget()).ticker_id.get(ticker)
+
+    (_, _, curto_emp, longo_emp), (acc_model, acc_date) = await asyncio.gather(
+        gerar_resumos_empresa_async(company_id),
+        acuracias_globais_async(version),
+    )
+    return await asyncio.to_thread(
+        montar_comparacao, curto_emp, longo_emp, acc_model, acc_date
+    )
+
+
+def acuracias_globais(conn):
+    """carregar_acuracias memorizado até a próxima versão dos dados."""
+    return aggregates_cache.get_or_compute(
+        "acuracias", lambda: carregar_acuracias(conn)
+    )
+
+
+async def acuracias_globais_async(version=None):
+    """Versão assíncrona de acuracias_globais."""
+    if version is None:
+        version = await get_data_version_async()
+    return await aggregates_cache.aget_or_compute(
+        "acuracias", carregar_acuracias_async, version
+    )
 
-    # ----- acurácias globais
-    acc_model, acc_date = calcular_acuracias(df_all)
 
-    # ----- consolida acurácias nos DataFrames da empresa
+@medir_pandas("comparison")
+def montar_comparacao(curto_emp, longo_emp, acc_model, acc_date):
+    """Consolida as acurácias nos DataFrames curto/longo da empresa."""
     # df_emp_full = anexar_acuracias(df_emp, acc_model, acc_date)  # UNUSED
     # vencedores_full = anexar_acuracias(vencedores_emp, acc_model, acc_date)  # UNUSED
     curto_full = anexar_acuracias(curto_emp, acc_model, acc_date)
@@ -306,6 +547,107 @@ def comparar_dados_empresa(ticker: str):
         "company_name": curto_full["company_name"].iloc[0],
     }
 
+# ----------------------------------------------------------------------
+# 6) Resumos de todas as empresas (build) ------------------------------
+# ----------------------------------------------------------------------
+# previsões das 9 datas mais recentes de cada empresa, numa só consulta
+ALL_COMPANIES_PREDICTIONS_SQL = """
+    WITH ultimas AS (
+        SELECT b3_code_id, date
+        FROM (
+            SELECT b3_code_id, date,
+                   row_number() OVER (PARTITION BY b3_code_id ORDER BY date DESC) AS n
+            FROM (SELECT DISTINCT b3_code_id, date FROM predictions) d
+        ) r
+        WHERE n <= 9
+    )
+    SELECT
+        p.date,
+        m.model AS model_name,
+        p.value,
+        c.name  AS company_name,
+        hc.column_name AS history_column_name,
+        p.history_columns_id,
+        p.b3_code_id,
+        c.b3_code
+    FROM predictions p
+    JOIN ultimas         u  ON u.b3_code_id = p.b3_code_id AND u.date = p.date
+    JOIN models          m  ON p.model_id          = m.id
+    JOIN companies       c  ON p.b3_code_id        = c.id
+    JOIN history_columns hc ON p.history_columns_id = hc.id
+    ORDER BY p.b3_code_id, p.date DESC
+"""
+
+
+def gerar_comparacoes(conn):
+    """
+    Payload de /comparison de todas as empresas numa passada vetorizada:
+    uma consulta de previsões, um lote de preços por coluna de histórico
+    e curto/longo recortados por groupby. Retorna {ticker: payload}.
+    """
+    with conn.cursor() as cur:
+        cur.execute(ALL_COMPANIES_PREDICTIONS_SQL)
+        df = pd.DataFrame(cur.fetchall(), columns=PREDICTION_COLUMNS + ["b3_code"])
+
+    at, ant = fetch_price_history_columns(conn, df)
+    df["price_history_value"] = at
+    df["price_history_value_anterior"] = ant
+    df = df[df["price_history_value"].notnull()].reset_index(drop=True)
+    df = calcular_metricas(df)
+
+    datas = df.groupby("b3_code_id")["date"]
+    # ordenação estável: empates de erro mantêm a ordem date/model_name
+    curto = df[df["date"] == datas.transform("min")].sort_values(
+        ["b3_code_id", "error_percent"], kind="stable"
+    )
+    longo = df[df["date"] == datas.transform("max")].sort_values(
+        ["b3_code_id", "error_percent"], kind="stable"
+    )
+
+    acc_model, acc_date = carregar_acuracias(conn)
+    curto_full = anexar_acuracias(curto, acc_model, acc_date)
+    longo_full = anexar_acuracias(longo, acc_model, acc_date)
+
+    longos = dict(tuple(longo_full.groupby("b3_code", sort=False)))
+    return {
+        ticker: {
+            "short_term": data_to_json(c.drop(columns="b3_code")),
+            "long_term": data_to_json(longos[ticker].drop(columns="b3_code")),
+            "company_name": c["company_name"].iloc[0],
+        }
+        for ticker, c in curto_full.groupby("b3_code", sort=False)
+    }
+
+# resumos gravados pelo build (build/.../company_comparisons.py)
+STORED_COMPARISON_SQL = """
+    SELECT payload::text FROM company_comparisons
+    WHERE b3_code = %s AND version = %s
+"""
+STORED_COMPARISONS_SQL = """
+    SELECT b3_code, payload::text FROM company_comparisons WHERE version = %s
+"""
+
+
+async def buscar_comparacao_async(ticker: str, version: str):
+    """Payload pré-calculado (bytes JSON) da versão atual, ou None."""
+    try:
+        rows = await fetch_all_async(
+            STORED_COMPARISON_SQL, (ticker, version), readonly=True
+        )
+    except errors.UndefinedTable:
+        return None
+    return rows[0][0].encode() if rows else None
+
+
+def carregar_comparacoes(conn, version: str):
+    """Todos os payloads pré-calculados da versão: {ticker: bytes JSON}."""
+    try:
+        with conn.transaction(), conn.cursor() as cur:
+            cur.execute(STORED_COMPARISONS_SQL, (version,))
+            return {ticker: payload.encode() for ticker, payload in cur.fetchall()}
+    except errors.UndefinedTable:
+        return {}
+
 # ----------------------------------------------------------------------
 # Commented out unused utilities to speed up API response
 # ----------------------------------------------------------------------
@@ -313,7 +655,7 @@ def data_to_json(data):
     """
     Converte um DataFrame em um dicionário JSON.
     """
-    return data.to_dict(orient="records")
+    return frame_to_records(data)
 
 if __name__ == "__main__":
     resultado = comparar_dados_empresa("PETR4.SA")
@@ -0,0 +1,63 @@
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from services.cache import DataVersion
+
+
+def etag(version: DataVersion) -> str:
+    # fraca: JSON e Arrow da mesma versão compartilham a etiqueta
+    return f'W/"{version.token}"'
+
+
+def validator_headers(version: DataVersion) -> Dict[str, str]:
+    """ETag / Last-Modified da versão dos dados."""
+    headers = {"ETag": etag(version), "Cache-Control": "no-cache"}
+    if version.updated_at is not None:
+        headers["Last-Modified"] = format_datetime(version.updated_at, usegmt=True)
+    return headers
+
+
+def _etag_matches(header: str, version: DataVersion) -> bool:
+    atual = etag(version).removeprefix("W/")
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == atual:
+            return True
+    return False
+
+
+def _not_modified_since(header: str, version: DataVersion) -> bool:
+    if version.updated_at is None:
+        return False
+    try:
+        desde = parsedate_to_datetime(header)
+        if desde.tzinfo is None:  # "-0000": sem fuso declarado, lido como UTC
+            desde = desde.replace(tzinfo=timezone.utc)
+        return version.updated_at.replace(microsecond=0) <= desde
+    except (TypeError, ValueError):
+        return False
+
+
+def not_modified(
+    request: Request, version: DataVersion, headers: Optional[Dict[str, str]] = None
+) -> Optional[Response]:
+    """
+    304 se o cliente já tem a versão atual (If-None-Match tem prioridade
+    sobre If-Modified-Since); None caso contrário.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        fresco = _etag_matches(if_none_match, version)
+    else:
+        since = request.headers.get("if-modified-since")
+        fresco = since is not None and _not_modified_since(since, version)
+
+    if not fresco:
+        return None
+    return Response(
+        status_code=304, headers={**validator_headers(version), **(headers or {})}
+    )
@@ -0,0 +1,68 @@
+import asyncio
+from services.cache import DataVersion, aggregates_cache, ticker_cache
+from services.dimensions import dimensions
+from services.prediction_service import get_prediction_from_db_async
+from services.serialization import dumps
+from services.snapshot import comparacao_async, snapshot
+from services.statistics_service import gerar_estatisticas_gerais_async
+from services.statistics_service_sector import gerar_estatisticas_por_setor_async
+
+
+async def _grafico_async(ticker: str, version: DataVersion) -> bytes:
+    """Mesmo gráfico de /prediction/{ticker} (cache por ticker ou SQL)."""
+    chave = ("prediction", ticker, None, None, None, version.token)
+    grafico = ticker_cache.get(chave)
+    if grafico is None:
+        grafico = await get_prediction_from_db_async(ticker)
+        ticker_cache.set(chave, grafico)
+    return grafico
+
+
+async def _estatistica_async(nome: str, chave, compute, version: DataVersion) -> bytes:
+    """
+    Bloco de /statistics (bytes JSON): do snapshot do build ou, sem ele,
+    serializado uma vez por versão no cache de agregados (o mesmo bloco
+    serve a todos os tickers).
+    """
+    pronto = snapshot.get("statistics", nome, version)
+    if pronto is not None:
+        return pronto
+
+    async def _serializar():
+        payload = await aggregates_cache.aget_or_compute(chave, compute, version)
+        return await asyncio.to_thread(dumps, payload)
+
+    return await aggregates_cache.aget_or_compute(("json", chave), _serializar, version)
+
+
+async def gerar_dashboard_async(ticker: str, version: DataVersion) -> bytes:
+    """
+    Gráfico, comparação e estatísticas de uma empresa numa só chamada
+    (bytes JSON), todos da versão `version` dos dados. O gráfico é o de
+    /prediction e a comparação a de /comparison; as estatísticas vêm
+    prontas do build (snapshot) e só são calculadas se ele não tiver a
+    versão atual. O trabalho em pandas e a serialização rodam fora do
+    event loop.
+    """
+    dims = await dimensions.aget(version)
+    sector_id = dims.empresa_setor.get(dims.ticker_id[ticker])
+
+    grafico, comparacao, general, sector = await asyncio.gather(
+        _grafico_async(ticker, version),
+        comparacao_async(ticker, version),
+        _estatistica_async(
+            "general", "general", gerar_estatisticas_gerais_async, version
+        ),
+        _estatistica_async(
+            str(sector_id),
+            ("sector", sector_id),
+            lambda: gerar_estatisticas_por_setor_async(sector_id),
+            version,
+        ),
+    )
+    return (
+        b'{"graph":' + grafico
+        + b',"comparison":' + comparacao
+        + b',"statistics":{"general":' + general + b',"sector":' + sector + b"}"
+        + b"}"
+    )
@@ -0,0 +1,97 @@
+import asyncio
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from config.db import fetch_all_async, get_conn
+
+# Dimensões pequenas (empresas e setores) mantidas em memória: tiram
+# lookups por ticker e joins com companies/sectors das consultas quentes.
+COMPANIES_DIM_SQL = "SELECT id, b3_code, name, sector_id FROM companies ORDER BY id"
+SECTORS_DIM_SQL = "SELECT id, name FROM sectors ORDER BY id"
+
+
+class Dimensoes(NamedTuple):
+    """Índices de empresas/setores de uma versão dos dados."""
+
+    versao: Optional[str]
+    ticker_id: Dict[str, int]           # b3_code → companies.id
+    empresa_ticker: Dict[int, str]      # id → b3_code
+    empresa_nome: Dict[int, str]        # id → nome
+    empresa_setor: Dict[int, int]       # id → sector_id
+    setor_nome: Dict[int, str]          # sector_id → nome
+    setor_empresas: Dict[int, List[int]]  # sector_id → ids das empresas
+    companies: List[Dict[str, Any]]     # payload de /companies
+    sectors: List[str]                  # payload de /sectors
+
+
+def _montar(empresas, setores, versao: Optional[str]) -> Dimensoes:
+    setor_nome = {sid: nome for sid, nome in setores}
+    setor_empresas: Dict[int, List[int]] = {sid: [] for sid in setor_nome}
+    for cid, _, _, sid in empresas:
+        setor_empresas.setdefault(sid, []).append(cid)
+
+    return Dimensoes(
+        versao=versao,
+        ticker_id={ticker: cid for cid, ticker, _, _ in empresas},
+        empresa_ticker={cid: ticker for cid, ticker, _, _ in empresas},
+        empresa_nome={cid: nome for cid, _, nome, _ in empresas},
+        empresa_setor={cid: sid for cid, _, _, sid in empresas},
+        setor_nome=setor_nome,
+        setor_empresas=setor_empresas,
+        # mesmo formato de companies_service (só empresas com setor)
+        companies=[
+            {
+                "ticker": ticker,
+                "name": nome,
+                "sector": setor_nome[sid],
+                "sector_id": sid,
+            }
+            for _, ticker, nome, sid in empresas
+            if sid in setor_nome
+        ],
+        sectors=list(setor_nome.values()),
+    )
+
+
+class DimensionIndex:
+    """
+    Carrega as dimensões uma vez e as recarrega quando a versão dos dados
+    informada muda ou após invalidate(). A troca é atômica: quem já pegou
+    um Dimensoes continua com um retrato consistente.
+    """
+
+    def __init__(self):
+        self._dims: Optional[Dimensoes] = None
+
+    def _vencido(self, version) -> bool:
+        return self._dims is None or (
+            version is not None and version.token != self._dims.versao
+        )
+
+    def get(self, version=None, conn=None) -> Dimensoes:
+        """`version` (DataVersion) força recarga se o índice for de outra versão."""
+        if self._vencido(version):
+            if conn is not None:
+                empresas = conn.execute(COMPANIES_DIM_SQL).fetchall()
+                setores = conn.execute(SECTORS_DIM_SQL).fetchall()
+            else:
+                with get_conn(readonly=True) as conn:
+                    empresas = conn.execute(COMPANIES_DIM_SQL).fetchall()
+                    setores = conn.execute(SECTORS_DIM_SQL).fetchall()
+            self._dims = _montar(empresas, setores, version and version.token)
+        return self._dims
+
+    async def aget(self, version=None) -> Dimensoes:
+        """Versão assíncrona de get (as duas consultas em paralelo)."""
+        if self._vencido(version):
+            empresas, setores = await asyncio.gather(
+                fetch_all_async(COMPANIES_DIM_SQL, readonly=True),
+                fetch_all_async(SECTORS_DIM_SQL, readonly=True),
+            )
+            self._dims = _montar(empresas, setores, version and version.token)
+        return self._dims
+
+    def invalidate(self) -> None:
+        self._dims = None
+
+
+dimensions = DimensionIndex()
@@ -0,0 +1,65 @@
+import numpy as np
+
+
+def lttb_indices(y, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets sobre várias séries ao mesmo tempo.
+
+    y: matriz (pontos × séries), com NaN onde a série não tem valor; o eixo x
+    é a posição do ponto. Em cada bucket escolhe o ponto cuja soma das áreas
+    dos triângulos (ponto anterior escolhido, candidato, média do próximo
+    bucket) entre as séries é máxima, preservando a forma de todas as linhas.
+    Devolve n_out índices crescentes, sempre com o primeiro e o último ponto.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    y = y.reshape(n, -1)
+
+    valid = ~np.isnan(y)
+    y0 = np.where(valid, y, 0.0)
+    x = np.arange(n, dtype=float)
+
+    # n_out - 2 buckets entre o primeiro e o último ponto; o "próximo
+    # bucket" do último é o próprio ponto final
+    edges = np.append(np.linspace(1, n - 1, n_out - 1).astype(int), n)
+
+    idx = np.empty(n_out, dtype=int)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi, prox = edges[i], edges[i + 1], edges[i + 2]
+
+        cnt = valid[hi:prox].sum(axis=0)
+        avg_y = np.divide(
+            y0[hi:prox].sum(axis=0), cnt, out=np.zeros(cnt.shape), where=cnt > 0
+        )
+        avg_x = x[hi:prox].mean()
+
+        area = np.abs(
+            (x[a] - avg_x) * (y0[lo:hi] - y0[a])
+            - (x[a] - x[lo:hi, None]) * (avg_y - y0[a])
+        )
+        # séries sem valor no ponto anterior, no candidato ou no próximo
+        # bucket não contam
+        area[~(valid[lo:hi] & valid[a] & (cnt > 0))] = 0.0
+
+        a = lo + int(area.sum(axis=1).argmax())
+        idx[i + 1] = a
+
+    return idx
+
+
+def downsample_graph(graph, max_points: int):
+    """
+    Reduz os pontos do gráfico (lista de dicts com date/real/modelos)
+    a no máximo max_points com LTTB sobre todas as séries numéricas.
+    """
+    if not max_points or len(graph) <= max_points:
+        return graph
+    series = list(dict.fromkeys(k for ponto in graph for k in ponto if k != "date"))
+    y = np.array(
+        [[ponto.get(s, np.nan) for s in series] for ponto in graph], dtype=float
+    )
+    return [graph[i] for i in lttb_indices(y, max_points)]
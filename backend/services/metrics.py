@@ -0,0 +1,297 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import lru_cache, wraps
+from hashlib import md5
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from psycopg import AsyncCursor, Cursor
+from starlette.routing import Match
+
+# Métricas da API em memória, expostas em /metrics no formato texto do
+# Prometheus (sem dependência externa). Valores acumulam desde o start.
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# limites dos histogramas, em segundos
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(**labels) -> Labels:
+    return tuple(sorted(labels.items()))
+
+
+def _fmt_labels(labels: Labels, extra: str = "") -> str:
+    pares = [f'{k}="{_escape(v)}"' for k, v in labels]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _escape(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_num(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+# ------------------------------------------------------------------
+# Tipos de métrica
+# ------------------------------------------------------------------
+class _Metric:
+    tipo = ""
+
+    def __init__(self, nome: str, ajuda: str):
+        self.nome = nome
+        self.ajuda = ajuda
+        self._lock = threading.Lock()
+
+    def _cabecalho(self) -> List[str]:
+        return [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+
+
+class Counter(_Metric):
+    tipo = "counter"
+
+    def __init__(self, nome: str, ajuda: str):
+        super().__init__(nome, ajuda)
+        self._valores: Dict[Labels, float] = {}
+
+    def inc(self, valor: float = 1, **labels) -> None:
+        chave = _labels(**labels)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0) + valor
+
+    def expor(self) -> List[str]:
+        with self._lock:
+            itens = sorted(self._valores.items())
+        return self._cabecalho() + [
+            f"{self.nome}{_fmt_labels(l)} {_fmt_num(v)}" for l, v in itens
+        ]
+
+
+class Gauge(Counter):
+    tipo = "gauge"
+
+    def dec(self, valor: float = 1, **labels) -> None:
+        self.inc(-valor, **labels)
+
+
+class Histogram(_Metric):
+    tipo = "histogram"
+
+    def __init__(self, nome: str, ajuda: str, buckets: Iterable[float]):
+        super().__init__(nome, ajuda)
+        self.buckets = tuple(buckets)
+        # por label: contagens por bucket (+Inf no fim), soma, total
+        self._series: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, valor: float, **labels) -> None:
+        chave = _labels(**labels)
+        i = bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = ([0] * (len(self.buckets) + 1), [0.0])
+            serie[0][i] += 1
+            serie[1][0] += valor
+
+    @contextmanager
+    def time(self, **labels):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - inicio, **labels)
+
+    def expor(self) -> List[str]:
+        with self._lock:
+            itens = sorted(
+                (l, list(contagens), soma[0]) for l, (contagens, soma) in self._series.items()
+            )
+        linhas = self._cabecalho()
+        for labels, contagens, soma in itens:
+            acumulado = 0
+            for limite, n in zip(self.buckets + (float("inf"),), contagens):
+                acumulado += n
+                le = f'le="{_fmt_num(float(limite))}"'
+                linhas.append(f"{self.nome}_bucket{_fmt_labels(labels, le)} {acumulado}")
+            linhas.append(f"{self.nome}_sum{_fmt_labels(labels)} {_fmt_num(soma)}")
+            linhas.append(f"{self.nome}_count{_fmt_labels(labels)} {acumulado}")
+        return linhas
+
+
+# ------------------------------------------------------------------
+# Métricas da API
+# ------------------------------------------------------------------
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Latência das requisições por rota (template do path).",
+    LATENCY_BUCKETS,
+)
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight", "Requisições em andamento por rota."
+)
+db_query_duration = Histogram(
+    "db_query_duration_seconds",
+    "Tempo de execução das consultas (execute + leitura do resultado).",
+    QUERY_BUCKETS,
+)
+db_query_rows = Counter("db_query_rows_total", "Linhas devolvidas/afetadas por consulta.")
+db_query_errors = Counter("db_query_errors_total", "Consultas que terminaram em erro.")
+pandas_duration = Histogram(
+    "pandas_processing_seconds",
+    "Pós-processamento em pandas por serviço e etapa.",
+    LATENCY_BUCKETS,
+)
+
+METRICAS: List[_Metric] = [
+    http_request_duration,
+    http_requests_in_flight,
+    db_query_duration,
+    db_query_rows,
+    db_query_errors,
+    pandas_duration,
+]
+
+
+def render() -> bytes:
+    """Todas as métricas no formato texto do Prometheus."""
+    linhas: List[str] = []
+    for metrica in METRICAS:
+        linhas += metrica.expor()
+    return ("\n".join(linhas) + "\n").encode()
+
+
+# ------------------------------------------------------------------
+# Rotas (middleware ASGI)
+# ------------------------------------------------------------------
+def _rota(scope) -> str:
+    """Template da rota ("/prediction/{ticker}"): um rótulo por rota, não por URL."""
+    for route in scope["app"].router.routes:
+        if route.matches(scope)[0] == Match.FULL:
+            return getattr(route, "path", scope["path"])
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """Latência e requisições em andamento de cada rota HTTP."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        rota, metodo = _rota(scope), scope["method"]
+        status = {"code": 500}
+
+        async def enviar(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc(route=rota, method=metodo)
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            http_requests_in_flight.dec(route=rota, method=metodo)
+            http_request_duration.observe(
+                time.perf_counter() - inicio,
+                route=rota, method=metodo, status=str(status["code"]),
+            )
+
+
+# ------------------------------------------------------------------
+# Consultas (cursor instrumentado)
+# ------------------------------------------------------------------
+@lru_cache(maxsize=1024)
+def _rotulo_sql(texto: str) -> str:
+    """Rótulo curto e estável da consulta: início do SQL + hash do texto."""
+    compacto = re.sub(r"\s+", " ", texto).strip()
+    return f"{compacto[:60]} #{md5(texto.encode()).hexdigest()[:8]}"
+
+
+def sql_text(query, conn=None) -> str:
+    """Texto da consulta (as montadas com psycopg.sql no contexto da conexão)."""
+    if isinstance(query, bytes):
+        return query.decode()
+    return query if isinstance(query, str) else query.as_string(conn)
+
+
+def query_label(query, conn=None) -> str:
+    return _rotulo_sql(sql_text(query, conn))
+
+
+# chamados após cada consulta bem-sucedida: f(rótulo, consulta, params,
+# segundos). Precisam ser baratos, rodam no caminho da requisição.
+QUERY_OBSERVERS: List[Callable[[str, Any, Any, float], None]] = []
+
+
+def _registrar(cur, query, params, inicio: float, erro: bool) -> None:
+    if not query:  # health check do pool (execute(""))
+        return
+    duracao = time.perf_counter() - inicio
+    rotulo = query_label(query, cur.connection)
+    db_query_duration.observe(duracao, query=rotulo)
+    if erro:
+        db_query_errors.inc(query=rotulo)
+        return
+    if cur.rowcount > 0:
+        db_query_rows.inc(cur.rowcount, query=rotulo)
+    for observer in QUERY_OBSERVERS:
+        observer(rotulo, query, params, duracao)
+
+
+class MeteredCursor(Cursor):
+    """Cursor dos pools: mede tempo e linhas de cada execute."""
+
+    def execute(self, query, params=None, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            resultado = super().execute(query, params, **kwargs)
+        except Exception:
+            _registrar(self, query, params, inicio, erro=True)
+            raise
+        _registrar(self, query, params, inicio, erro=False)
+        return resultado
+
+
+class AsyncMeteredCursor(AsyncCursor):
+    """Versão assíncrona de MeteredCursor."""
+
+    async def execute(self, query, params=None, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            resultado = await super().execute(query, params, **kwargs)
+        except Exception:
+            _registrar(self, query, params, inicio, erro=True)
+            raise
+        _registrar(self, query, params, inicio, erro=False)
+        return resultado
+
+
+# ------------------------------------------------------------------
+# Pós-processamento em pandas
+# ------------------------------------------------------------------
+def medir_pandas(service: str):
+    """Decorador: acumula o tempo da função em pandas_processing_seconds."""
+
+    def decorador(func):
+        @wraps(func)
+        def medido(*args, **kwargs):
+            with pandas_duration.time(service=service, step=func.__name__):
+                return func(*args, **kwargs)
+
+        return medido
+
+    return decorador
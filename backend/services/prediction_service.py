@@ -1,69 +1,139 @@
-from collections import defaultdict
-from config.db import conn
+import asyncio
+import orjson
+from config.db import fetch_all_async
+from services.dimensions import dimensions
+from services.downsampling import downsample_graph
+from services.serialization import dumps
 
-def get_prediction_from_db(ticker: str):
+# Gráfico inteiro montado no Postgres: pivot (date × modelo), recorte a
+# partir da primeira data com valor real, primeiro/último preço real e
+# max(updated_at). Sai como texto JSON pronto para ser repassado.
+# json (e não jsonb) preserva a representação exata dos float8.
+_GRAPH_SQL = """
+    WITH linhas AS (
+        SELECT
+            p.date,
+            lower(m.model) AS model,
+            p.value::float8 AS value,
+            ph.close::float8 AS real,
+            p.updated_at
+        FROM predictions p
+        LEFT JOIN models m ON p.model_id = m.id
+        LEFT JOIN price_history ph
+               ON p.date = ph.date AND ph.company_id = p.b3_code_id
+        WHERE p.b3_code_id = {empresa}
+          AND p.date >= COALESCE(%(date_from)s::date, '-infinity')
+          AND p.date <= COALESCE(%(date_to)s::date, 'infinity')
+    ),
+    pontos AS (
+        SELECT date, max(real) AS real, max(updated_at) AS updated_at
+        FROM linhas
+        GROUP BY date
+    ),
+    recorte AS (
+        -- ⚠️ ignora datas anteriores à primeira com valor "real"
+        SELECT *
+        FROM pontos
+        WHERE date >= COALESCE(
+            (SELECT min(date) FROM pontos WHERE real IS NOT NULL), '-infinity'
+        )
+    ),
+    campos AS (
+        SELECT date, 0 AS ordem, 'real' AS chave, to_json(real) AS valor
+        FROM recorte WHERE real IS NOT NULL
+        UNION ALL
+        SELECT date, 1, 'date', to_json(to_char(date, 'DD/MM/YYYY'))
+        FROM recorte
+        UNION ALL
+        SELECT l.date, 2, l.model, to_json(l.value)
+        FROM linhas l JOIN recorte r USING (date)
+    ),
+    grafico AS (
+        SELECT date, json_object_agg(chave, valor ORDER BY ordem) AS ponto
+        FROM campos
+        GROUP BY date
+    ),
+    extremos AS (
+        SELECT
+            (SELECT real FROM recorte ORDER BY date LIMIT 1) AS first_real,
+            (SELECT real FROM recorte WHERE real IS NOT NULL
+              ORDER BY date DESC LIMIT 1) AS last_real
+    )
+    SELECT json_build_object(
+        'graph', COALESCE((SELECT json_agg(ponto ORDER BY date) FROM grafico), '[]'),
+        'price', e.last_real,
+        'variation', (e.last_real - e.first_real) / e.first_real * 100,
+        'updated_at', (SELECT to_char(max(updated_at), 'DD/MM/YYYY') FROM pontos)
+    )::text
+    FROM extremos e
+"""
+PREDICTION_GRAPH_SQL = _GRAPH_SQL.format(empresa="%(company_id)s") + ";"
+
+# Várias empresas numa só consulta: o mesmo gráfico, uma linha por
+# empresa (na ordem pedida); empresas sem previsões não aparecem.
+BATCH_PREDICTION_GRAPH_SQL = """
+    SELECT c.id, g.doc
+    FROM unnest(%(company_ids)s::int[]) WITH ORDINALITY AS c(id, ordem)
+    CROSS JOIN LATERAL ({grafico}) AS g(doc)
+    WHERE EXISTS (SELECT 1 FROM predictions p WHERE p.b3_code_id = c.id)
+    ORDER BY c.ordem;
+""".format(grafico=_GRAPH_SQL.format(empresa="c.id"))
+
+def _params(company_id, date_from, date_to):
+    return {"company_id": company_id, "date_from": date_from, "date_to": date_to}
+
+
+def _limitar_pontos(doc: bytes, max_points):
+    """Com max_points, o único caso em que o JSON do banco é reaberto."""
+    if not max_points:
+        return doc
+    payload = orjson.loads(doc)
+    payload["graph"] = downsample_graph(payload["graph"], max_points)
+    return dumps(payload)
+
+
+async def get_prediction_from_db_async(
+    ticker: str, date_from=None, date_to=None, max_points=None
+):
     """
-    Retorna as previsões formatadas para gráfico,
+    Retorna as previsões formatadas para gráfico (bytes JSON),
     começando a partir da primeira data com valor real.
+    date_from/date_to recortam o período no SQL; max_points reduz o
+    gráfico com LTTB (fora do event loop) mantendo a forma das linhas.
     """
-    with conn.cursor() as cursor:
-        cursor.execute("""
-            SELECT 
-                p.date,
-                p.model_id,
-                p.value,
-                m.model,
-                ph.close AS real,
-                p.updated_at
-            FROM 
-                predictions p
-            LEFT JOIN 
-                models m ON p.model_id = m.id
-            LEFT JOIN 
-                price_history ph ON p.date = ph.date AND ph.company_id = p.b3_code_id
-            LEFT JOIN
-                companies c ON p.b3_code_id = c.id
-            WHERE 
-                c.b3_code = %s
-            ORDER BY 
-                p.date ASC;
-        """, (ticker,))
-        rows = cursor.fetchall()
-
-    grouped = defaultdict(dict)
+    company_id = (await dimensions.aget()).ticker_id.get(ticker)
+    ((doc,),) = await fetch_all_async(
+        PREDICTION_GRAPH_SQL, _params(company_id, date_from, date_to)
+    )
+    if max_points:
+        return await asyncio.to_thread(_limitar_pontos, doc.encode(), max_points)
+    return doc.encode()
 
-    for row in rows:
-        data_formatada = row[0].strftime("%d/%m/%Y")
-        model_name = row[3].lower()
-        valor_previsto = float(row[2])
-        valor_real = row[4]
-        updated_at = row[5]
-        if valor_real is not None:
-            grouped[data_formatada]["real"] = float(valor_real)
-            
-        grouped[data_formatada]["date"] = data_formatada
-        grouped[data_formatada][model_name] = valor_previsto
 
+async def _graficos_async(ids, tickers):
+    """{ticker: bytes JSON do gráfico} das empresas `ids`, na mesma ordem."""
+    rows = await fetch_all_async(
+        BATCH_PREDICTION_GRAPH_SQL,
+        {"company_ids": list(ids), "date_from": None, "date_to": None},
+    )
+    return {tickers[company_id]: doc.encode() for company_id, doc in rows}
 
-    # ⚠️ Ignorar datas anteriores à primeira com valor "real"
-    valores = list(grouped.values())
-    inicio_real = next((i for i, item in enumerate(valores) if "real" in item), 0)
 
-    # ­­­­­­­­­­­­­­­­­­­­­­­­­  dados que vão para o gráfico
-    graph_data = valores[inicio_real:]
+async def get_predictions_from_db_async(tickers):
+    """Gráficos de várias empresas numa única consulta: {ticker: bytes JSON}."""
+    dims = await dimensions.aget()
+    ids = [dims.ticker_id[t] for t in tickers if t in dims.ticker_id]
+    return await _graficos_async(ids, dims.empresa_ticker)
 
-    # primeiro e último preço real
-    first_real = graph_data[0]["real"]
-    last_real  = next(item["real"] for item in reversed(graph_data) if "real" in item)
 
-    # date formatado
-    updated_at = updated_at.strftime("%d/%m/%Y") if updated_at else None
+async def get_sector_predictions_from_db_async(sector_id: int):
+    """Gráficos de todas as empresas de um setor numa única consulta."""
+    dims = await dimensions.aget()
+    ids = dims.setor_empresas.get(sector_id, [])
+    return await _graficos_async(ids, dims.empresa_ticker)
 
-    response = {
-        "graph":     graph_data,
-        "price":     last_real,                                   
-        "variation": (last_real - first_real) / first_real * 100,
-        "updated_at": updated_at,
-    }
 
-    return response
+def juntar_graficos(graficos, ordem=None) -> bytes:
+    """{ticker: bytes JSON} → objeto JSON, sem reabrir os gráficos."""
+    ordem = graficos if ordem is None else [t for t in ordem if t in graficos]
+    return b"{" + b",".join(dumps(t) + b":" + graficos[t] for t in ordem) + b"}"
@@ -1,12 +1,6 @@
-from config.db import conn
+from services.dimensions import dimensions
 
 
-def get_sectors_from_db(): 
-    """
-    Função para obter os setores da base de dados.
-    """
-    with conn.cursor() as cursor:
-        cursor.execute("SELECT name FROM sectors")
-        rows = cursor.fetchall()
-        sectors = [row[0] for row in rows]
-    return sectors
+async def get_sectors_from_db_async(version=None):
+    """Setores, servidos pelo índice de dimensões em memória."""
+    return (await dimensions.aget(version)).sectors
@@ -0,0 +1,53 @@
+import asyncio
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List
+
+import numpy as np
+import orjson
+import pandas as pd
+from fastapi.responses import JSONResponse, Response
+
+# numpy (escalares e arrays) serializado nativamente pelo orjson
+_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any) -> Any:
+    """Tipos que o orjson não conhece, convertidos como o jsonable_encoder."""
+    if isinstance(obj, Decimal):
+        return int(obj) if obj.as_tuple().exponent >= 0 else float(obj)
+    # antes das datas: pd.NaT também é instância de datetime
+    if obj is pd.NaT or obj is pd.NA:
+        return None
+    if isinstance(obj, (pd.Timestamp, datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Tipo não serializável: {type(obj).__name__}")
+
+
+def dumps(obj: Any) -> bytes:
+    """Payload (dicts/listas com numpy, Decimal, datas) → bytes JSON."""
+    return orjson.dumps(obj, default=_default, option=_OPTIONS)
+
+
+def frame_to_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    DataFrame → lista de dicionários com tipos nativos, convertendo
+    coluna a coluna (tolist) em vez de célula a célula.
+    """
+    cols = list(df.columns)
+    values = [df[c].tolist() for c in cols]
+    return [dict(zip(cols, row)) for row in zip(*values)]
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse serializado pelo orjson, sem passar pelo jsonable_encoder."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+async def json_response_async(content: Any, headers=None) -> Response:
+    """FastJSONResponse serializada numa thread: payloads grandes não travam o event loop."""
+    return await asyncio.to_thread(FastJSONResponse, content, headers=headers)
@@ -0,0 +1,58 @@
+import asyncio
+import threading
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """
+    Coalescência de requisições: chamadas concorrentes com a mesma chave
+    (endpoint, argumentos) esperam a computação já em andamento e recebem
+    o mesmo resultado (ou a mesma exceção), em vez de repeti-la.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._futures: Dict[Tuple[str, Hashable], asyncio.Future] = {}
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"computations": 0, "coalesced": 0}
+        )
+
+    async def ado(
+        self, endpoint: str, args: Hashable, fn: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Executa `fn` uma vez por chave; chamadas concorrentes recebem o mesmo resultado."""
+        key = (endpoint, args)
+        with self._lock:
+            task = self._futures.get(key)
+            if task is None:
+                # a computação roda numa task própria: sobrevive ao cancelamento
+                # de quem a disparou e entrega o resultado aos demais
+                task = asyncio.ensure_future(fn())
+                self._futures[key] = task
+                task.add_done_callback(lambda t, key=key: self._concluir(key, t))
+                self._stats[endpoint]["computations"] += 1
+            else:
+                self._stats[endpoint]["coalesced"] += 1
+
+        # shield: um cliente que desiste (inclusive o primeiro) não cancela
+        # a computação nem os demais que a esperam
+        return await asyncio.shield(task)
+
+    def _concluir(self, key: Tuple[str, Hashable], task: asyncio.Future) -> None:
+        with self._lock:
+            if self._futures.get(key) is task:
+                del self._futures[key]
+        if not task.cancelled():
+            task.exception()  # marcada como lida mesmo se ninguém mais esperar
+
+    def stats(self) -> Dict[str, Any]:
+        """Computações executadas vs. requisições coalescidas, por endpoint."""
+        with self._lock:
+            return {
+                "in_flight": len(self._futures),
+                "endpoints": {k: dict(v) for k, v in self._stats.items()},
+            }
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,197 @@
+import logging
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from psycopg import Cursor, sql
+
+from config.db import get_conn
+from services.metrics import QUERY_OBSERVERS, sql_text
+
+# Log de consultas lentas (opcional): consultas acima do limite vão para
+# um arquivo rotativo com os parâmetros e o plano EXPLAIN (ANALYZE, BUFFERS).
+# Desligado por padrão; ligue aqui ou em PUT /admin/slow-queries.
+SLOW_QUERY_THRESHOLD_MS: Optional[float] = None  # ex.: 200
+SLOW_QUERY_EXPLAIN = True
+
+SLOW_QUERY_DIR = Path(__file__).resolve().parent.parent / "logs"
+SLOW_QUERY_FILE = SLOW_QUERY_DIR / "slow_queries.log"
+SLOW_QUERY_MAX_BYTES = 5 * 1024 * 1024
+SLOW_QUERY_BACKUPS = 5
+
+EXPLAIN_INTERVAL = 300        # segundos entre dois EXPLAIN da mesma consulta
+EXPLAIN_TIMEOUT = "30s"       # statement_timeout do EXPLAIN ANALYZE
+EXPLAIN_QUEUE_SIZE = 100      # consultas à espera de EXPLAIN; excedentes são descartadas
+MAX_PARAMS_CHARS = 500
+
+
+def _resumir_params(params) -> Optional[str]:
+    if params is None:
+        return None
+    texto = repr(params)
+    return texto if len(texto) <= MAX_PARAMS_CHARS else texto[:MAX_PARAMS_CHARS] + "…"
+
+
+class SlowQueryLog:
+    """
+    Observador do cursor instrumentado (services/metrics.py): conta as
+    consultas lentas por rótulo e, numa thread própria, grava cada uma
+    no log com o plano. O EXPLAIN ANALYZE roda de novo a consulta numa
+    transação somente leitura desfeita ao final, no máximo uma vez a
+    cada EXPLAIN_INTERVAL por consulta.
+    """
+
+    def __init__(self, threshold_ms: Optional[float] = None, explain: bool = True):
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._explicado_em: Dict[str, float] = {}
+        self._fila: "queue.Queue" = queue.Queue(EXPLAIN_QUEUE_SIZE)
+        self._worker: Optional[threading.Thread] = None
+        self._logger: Optional[logging.Logger] = None
+
+    # --------------------------------------------------------------
+    # Configuração
+    # --------------------------------------------------------------
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms is not None
+
+    def configure(self, threshold_ms: Optional[float], explain: bool = True) -> None:
+        """`threshold_ms=None` desliga o log."""
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+
+    def _get_logger(self) -> logging.Logger:
+        if self._logger is None:
+            SLOW_QUERY_DIR.mkdir(exist_ok=True)
+            logger = logging.getLogger("slow_queries")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            handler = RotatingFileHandler(
+                SLOW_QUERY_FILE,
+                maxBytes=SLOW_QUERY_MAX_BYTES,
+                backupCount=SLOW_QUERY_BACKUPS,
+                encoding="utf-8",
+            )
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            logger.addHandler(handler)
+            self._logger = logger
+        return self._logger
+
+    # --------------------------------------------------------------
+    # Caminho da requisição
+    # --------------------------------------------------------------
+    def observe(self, rotulo: str, query, params, segundos: float) -> None:
+        limite = self.threshold_ms
+        ms = segundos * 1000
+        if limite is None or ms < limite:
+            return
+
+        agora = time.time()
+        with self._lock:
+            st = self._stats.get(rotulo)
+            if st is None:
+                st = self._stats[rotulo] = {
+                    "query": rotulo, "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                    "last_params": None, "last_seen": None, "plan": None,
+                }
+            st["count"] += 1
+            st["total_ms"] += ms
+            st["max_ms"] = max(st["max_ms"], ms)
+            st["last_params"] = _resumir_params(params)
+            st["last_seen"] = datetime.fromtimestamp(agora, timezone.utc).isoformat()
+
+            explicar = self.explain and (
+                agora - self._explicado_em.get(rotulo, 0) >= EXPLAIN_INTERVAL
+            )
+            if explicar:
+                self._explicado_em[rotulo] = agora
+
+        try:
+            self._fila.put_nowait((rotulo, query, params, ms, explicar))
+        except queue.Full:
+            return
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(
+                target=self._processar, name="slow-query-log", daemon=True
+            )
+            self._worker.start()
+
+    # --------------------------------------------------------------
+    # Thread de gravação
+    # --------------------------------------------------------------
+    def _processar(self) -> None:
+        while True:
+            rotulo, query, params, ms, explicar = self._fila.get()
+            try:
+                self._gravar(rotulo, query, params, ms, explicar)
+            except Exception as exc:  # log nunca derruba a API
+                self._get_logger().warning("falha ao registrar %s: %r", rotulo, exc)
+
+    def _gravar(self, rotulo: str, query, params, ms: float, explicar: bool) -> None:
+        plano = None
+        if isinstance(query, bytes):
+            query = query.decode()
+        if explicar or not isinstance(query, str):
+            with get_conn(readonly=True) as conn:
+                texto = sql_text(query, conn)
+                if explicar:
+                    plano = self._explain(conn, query, params)
+        else:
+            texto = query
+
+        linhas = [f"{ms:.1f} ms  {rotulo}", f"  params: {_resumir_params(params)}"]
+        linhas += ["  " + l for l in texto.strip().splitlines()]
+        if plano is not None:
+            linhas.append("  plano:")
+            linhas += ["    " + l for l in plano.splitlines()]
+            with self._lock:
+                if rotulo in self._stats:
+                    self._stats[rotulo]["plan"] = plano
+        self._get_logger().info("\n".join(linhas))
+
+    @staticmethod
+    def _explain(conn, query, params) -> str:
+        consulta = query if isinstance(query, sql.Composable) else sql.SQL(query)
+        explain = sql.SQL("EXPLAIN (ANALYZE, BUFFERS) ") + consulta
+        # cursor puro: o próprio EXPLAIN não entra nas métricas nem neste log
+        with conn.transaction(force_rollback=True), Cursor(conn) as cur:
+            cur.execute("SET TRANSACTION READ ONLY")
+            cur.execute(sql.SQL("SET LOCAL statement_timeout = {}").format(EXPLAIN_TIMEOUT))
+            cur.execute(explain, params)
+            return "\n".join(row[0] for row in cur.fetchall())
+
+    # --------------------------------------------------------------
+    # Resumo (/admin/slow-queries)
+    # --------------------------------------------------------------
+    def summary(self, limit: int = 20) -> Dict[str, Any]:
+        """Piores consultas por tempo total acima do limite."""
+        with self._lock:
+            itens = [dict(st) for st in self._stats.values()]
+        itens.sort(key=lambda st: st["total_ms"], reverse=True)
+        for st in itens:
+            st["mean_ms"] = round(st["total_ms"] / st["count"], 2)
+            st["total_ms"] = round(st["total_ms"], 2)
+            st["max_ms"] = round(st["max_ms"], 2)
+        return {
+            "enabled": self.enabled,
+            "threshold_ms": self.threshold_ms,
+            "explain": self.explain,
+            "log_file": str(SLOW_QUERY_FILE),
+            "queries": itens[:limit],
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self._explicado_em.clear()
+
+
+slow_query_log = SlowQueryLog(SLOW_QUERY_THRESHOLD_MS, SLOW_QUERY_EXPLAIN)
+QUERY_OBSERVERS.append(slow_query_log.observe)
@@ -0,0 +1,238 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import pyarrow as pa
+
+from config.db import get_conn
+from services.cache import DataVersion, get_data_version, ticker_cache
+from services.comparison_service import (
+    buscar_comparacao_async,
+    carregar_comparacoes,
+    comparar_dados_empresa_async,
+    gerar_comparacoes,
+)
+from services.serialization import dumps
+from services.single_flight import single_flight
+from services.statistics_service import (
+    gerar_estatisticas_gerais,
+    gerar_estatisticas_todos_setores,
+)
+from services.statistics_service_sector import gerar_estatisticas_por_setor
+
+# Snapshot dos payloads da API, gravado no fim do run_build: um arquivo
+# Arrow IPC (Feather v2) por versão dos dados, lido via memory map.
+SNAPSHOT_DIR = Path(
+    os.environ.get("TCC_B3_SNAPSHOT_DIR")
+    or Path(__file__).resolve().parent.parent / "snapshot"
+)
+SNAPSHOT_PREFIX = "api_v"
+
+# uma linha por payload: (tipo, chave) → JSON pronto para ser repassado
+SNAPSHOT_SCHEMA = pa.schema(
+    [("kind", pa.string()), ("key", pa.string()), ("payload", pa.binary())]
+)
+
+SECTOR_IDS_SQL = "SELECT id FROM sectors ORDER BY id"
+
+# o build publica a versão (NOTIFY) antes de gravar o snapshot: sem o
+# arquivo, a versão é procurada de novo após este intervalo (segundos)
+RELOAD_RETRY = 2.0
+
+logger = logging.getLogger(__name__)
+
+
+def _arquivo(token: str, directory: Optional[Path] = None) -> Path:
+    return (directory or SNAPSHOT_DIR) / f"{SNAPSHOT_PREFIX}{token}.arrow"
+
+
+# ------------------------------------------------------------------
+# Escrita (build)
+# ------------------------------------------------------------------
+def write_snapshot() -> Path:
+    """
+    Calcula e grava os payloads de /statistics (geral, por setor e
+    todos os setores) e /comparison de cada empresa para a versão atual
+    dos dados. Versões anteriores são removidas. /companies e /sectors
+    vêm do índice de dimensões (services/dimensions.py).
+    """
+    with get_conn(readonly=True) as conn:
+        version = get_data_version(conn)
+        with conn.cursor() as cur:
+            cur.execute(SECTOR_IDS_SQL)
+            sector_ids = [row[0] for row in cur.fetchall()]
+        # gravadas pelo passo anterior do build; recalcula se não houver
+        comparacoes = carregar_comparacoes(conn, version.token) or {
+            ticker: dumps(payload) for ticker, payload in gerar_comparacoes(conn).items()
+        }
+
+    linhas = [
+        ("statistics", "general", dumps(gerar_estatisticas_gerais())),
+        ("statistics", "all", dumps(gerar_estatisticas_todos_setores())),
+    ]
+    linhas += [
+        ("statistics", str(sid), dumps(gerar_estatisticas_por_setor(sid)))
+        for sid in sector_ids
+    ]
+    linhas += [
+        ("comparison", ticker, payload) for ticker, payload in comparacoes.items()
+    ]
+
+    table = pa.Table.from_arrays(
+        [pa.array(col, type=f.type) for col, f in zip(zip(*linhas), SNAPSHOT_SCHEMA)],
+        schema=SNAPSHOT_SCHEMA.with_metadata({"version": version.token}),
+    )
+
+    SNAPSHOT_DIR.mkdir(exist_ok=True)
+    destino = _arquivo(version.token)
+    temporario = destino.with_suffix(".tmp")
+    with pa.OSFile(str(temporario), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(temporario, destino)
+
+    for antigo in SNAPSHOT_DIR.glob(f"{SNAPSHOT_PREFIX}*.arrow"):
+        if antigo != destino:
+            antigo.unlink(missing_ok=True)
+    return destino
+
+
+# ------------------------------------------------------------------
+# Leitura (API)
+# ------------------------------------------------------------------
+class _Estado(NamedTuple):
+    """Snapshot mapeado; trocado inteiro a cada carga."""
+
+    version: str
+    index: Dict[Tuple[str, str], int]
+    payloads: pa.ChunkedArray
+
+
+class Snapshot:
+    """
+    Payloads pré-calculados pelo build, servidos enquanto a versão do
+    snapshot for a versão atual dos dados. Ao surgir uma versão nova,
+    procura o snapshot dela numa thread (de novo a cada RELOAD_RETRY
+    enquanto o arquivo não existir): até lá as rotas seguem pelo
+    caminho normal.
+    """
+
+    def __init__(self, directory: Path = SNAPSHOT_DIR):
+        self._directory = directory
+        self._lock = threading.Lock()
+        self._estado: Optional[_Estado] = None
+        # última procura em segundo plano: (versão, time.monotonic())
+        self._procura_lock = threading.Lock()
+        self._procurado: Optional[Tuple[str, float]] = None
+        self._recarga: Optional[threading.Thread] = None
+
+    @property
+    def version(self) -> Optional[str]:
+        estado = self._estado
+        return None if estado is None else estado.version
+
+    def load(self, token: Optional[str] = None) -> Optional[str]:
+        """Mapeia o snapshot da versão `token` (ou o mais recente)."""
+        with self._lock:
+            if token is not None and token == self.version:
+                return token
+            arquivos = (
+                [_arquivo(token, self._directory)]
+                if token is not None
+                else sorted(
+                    self._directory.glob(f"{SNAPSHOT_PREFIX}*.arrow"),
+                    key=lambda p: p.stat().st_mtime,
+                )[-1:]
+            )
+            arquivo = next((a for a in arquivos if a.exists()), None)
+            if arquivo is None:
+                return self.version
+
+            inicio = time.perf_counter()
+            table = pa.ipc.open_file(pa.memory_map(str(arquivo))).read_all()
+            estado = _Estado(
+                version=table.schema.metadata[b"version"].decode(),
+                index={
+                    chave: i
+                    for i, chave in enumerate(
+                        zip(table["kind"].to_pylist(), table["key"].to_pylist())
+                    )
+                },
+                payloads=table["payload"],
+            )
+            # uma atribuição: get() nunca vê índice e payloads de versões diferentes
+            self._estado = estado
+            logger.info(
+                "Snapshot v%s carregado: %d payloads em %.1f ms",
+                estado.version,
+                len(estado.index),
+                (time.perf_counter() - inicio) * 1000,
+            )
+            return estado.version
+
+    def get(self, kind: str, key: str, version: DataVersion) -> Optional[bytes]:
+        """Payload JSON de (kind, key) se o snapshot é da versão atual."""
+        estado = self._estado
+        if estado is None or estado.version != version.token:
+            self._recarregar(version.token)
+            return None
+        i = estado.index.get((kind, key))
+        return None if i is None else estado.payloads[i].as_py()
+
+    def _recarregar(self, token: str) -> None:
+        """Procura o snapshot de `token` em segundo plano (no máximo uma vez por RELOAD_RETRY)."""
+        agora = time.monotonic()
+        with self._procura_lock:
+            if self._recarga is not None and self._recarga.is_alive():
+                return
+            if (
+                self._procurado is not None
+                and self._procurado[0] == token
+                and agora - self._procurado[1] < RELOAD_RETRY
+            ):
+                return
+            self._procurado = (token, agora)
+            self._recarga = threading.Thread(
+                target=self.load, args=(token,), name="snapshot-load", daemon=True
+            )
+            self._recarga.start()
+
+
+snapshot = Snapshot()
+
+
+async def comparacao_pronta_async(ticker: str, version: DataVersion) -> Optional[bytes]:
+    """
+    Payload de /comparison já calculado para a versão atual: cache por
+    ticker, snapshot do build ou company_comparisons. None se nenhum tiver.
+    """
+    chave = ("comparison", ticker, version.token)
+    pronto = ticker_cache.get(chave) or snapshot.get("comparison", ticker, version)
+    if pronto is None:
+        # resumo gravado pelo build (uma leitura pela chave primária); só
+        # este caminho vai ao cache, o snapshot já está em memória
+        pronto = await buscar_comparacao_async(ticker, version.token)
+        if pronto is not None:
+            ticker_cache.set(chave, pronto)
+    return pronto
+
+
+async def comparacao_async(ticker: str, version: DataVersion) -> bytes:
+    """
+    Payload de /comparison (bytes JSON): o já calculado ou, se nenhum
+    tiver a versão atual, calculado na hora uma vez por ticker e versão.
+    """
+    pronto = await comparacao_pronta_async(ticker, version)
+    if pronto is None:
+        comparacao = await single_flight.ado(
+            "comparison",
+            (ticker, version.token),
+            lambda: comparar_dados_empresa_async(ticker, version),
+        )
+        pronto = await asyncio.to_thread(dumps, comparacao)
+        ticker_cache.set(("comparison", ticker, version.token), pronto)
+    return pronto
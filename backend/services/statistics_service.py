@@ -1,8 +1,14 @@
 # statistics_service.py
-import psycopg
+import asyncio
+from contextlib import nullcontext
 import pandas as pd
 import numpy as np
+from psycopg import errors
 from sklearn.metrics import r2_score
+from config.db import fetch_all_async, get_conn as get_db_conn
+from services.dimensions import dimensions
+from services.metrics import medir_pandas
+from services.serialization import frame_to_records
 from typing import Dict, List, Any
 
 
@@ -10,13 +16,8 @@ from typing import Dict, List, Any
 # Conexão
 # ------------------------------------------------------------------
 def get_conn():
-    return psycopg.connect(
-        dbname="tcc_b3",
-        user="compareter",
-        password="postgres",
-        host="localhost",
-        port="5432"
-    )
+    """Empresta uma conexão do pool somente leitura."""
+    return get_db_conn(readonly=True)
 
 
 # ------------------------------------------------------------------
@@ -31,83 +32,95 @@ def hit_rate(df: pd.DataFrame) -> float:
     return float(df["hit"].mean() * 100)
 
 
-def _numpy_to_py(obj: Any) -> Any:
-    """Converte np.* ou pd.Timestamp em tipos nativos JSON‐safe."""
-    if isinstance(obj, (np.integer,)):
-        return int(obj)
-    if isinstance(obj, (np.floating,)):
-        return float(obj)
-    if isinstance(obj, (np.ndarray,)):
-        return obj.tolist()
-    if isinstance(obj, pd.Timestamp):
-        return obj.isoformat()
-    return obj
+# ------------------------------------------------------------------
+# Consultas
+# ------------------------------------------------------------------
+# Quem foi o “vencedor” em cada dia/papel (pré-calculado pelo build)
+WINNERS_SQL = """
+    SELECT  w.date,
+            w.b3_code_id,
+            w.model,
+            w.y_pred,
+            w.y_true,
+            w.prev_close
+    FROM daily_winners w;
+"""
+WINNERS_COLUMNS = ["date", "b3_code_id", "model", "y_pred", "y_true", "prev_close"]
+
+# Sem daily_winners (banco ainda não passou pelo build novo): o mesmo
+# ranking de UPSERT_WINNERS calculado na hora sobre predictions.
+# {filtro} recebe a restrição de empresas (vazio = todas).
+RANKED_WINNERS_SQL = """
+    SELECT DISTINCT ON (p.date, p.b3_code_id)
+           p.date,
+           p.b3_code_id,
+           m.model,
+           p.value    AS y_pred,
+           ph.close   AS y_true,
+           prev.close AS prev_close
+    FROM predictions      p
+    JOIN models           m  ON m.id = p.model_id
+    JOIN history_columns  hc ON hc.id = p.history_columns_id
+    JOIN price_history    ph ON ph.company_id = p.b3_code_id
+                            AND ph.date      = p.date
+    LEFT JOIN LATERAL (
+      SELECT pp.close
+      FROM price_history pp
+      WHERE pp.company_id = p.b3_code_id
+        AND pp.date       < p.date
+      ORDER BY pp.date DESC
+      LIMIT 1
+    ) prev ON TRUE
+    WHERE hc.column_name ILIKE 'close' {filtro}
+    ORDER BY p.date, p.b3_code_id, ABS(p.value - ph.close) / ph.close;
+"""
+WINNERS_FALLBACK_SQL = RANKED_WINNERS_SQL.format(filtro="")
+
+
+def buscar_winners(cur, query=WINNERS_SQL, fallback=WINNERS_FALLBACK_SQL, params=None):
+    """Linhas de daily_winners; sem a tabela, o ranking calculado na hora."""
+    try:
+        with cur.connection.transaction():
+            cur.execute(query, params)
+            return cur.fetchall()
+    except errors.UndefinedTable:
+        cur.execute(fallback, params)
+        return cur.fetchall()
+
+
+async def buscar_winners_async(query=WINNERS_SQL, fallback=WINNERS_FALLBACK_SQL, params=None):
+    """Versão assíncrona de buscar_winners."""
+    try:
+        return await fetch_all_async(query, params, readonly=True)
+    except errors.UndefinedTable:
+        return await fetch_all_async(fallback, params, readonly=True)
 
 
 # ------------------------------------------------------------------
 # Função principal
 # ------------------------------------------------------------------
-def gerar_estatisticas_gerais() -> Dict[str, Any]:
+def gerar_estatisticas_gerais(conn=None) -> Dict[str, Any]:
     """
     Calcula métricas gerais (MAE, RMSE, SMAPE, R², Hit-rate)
     considerando apenas o “vencedor” (melhor modelo) de cada
     dia/papel. Retorna um dicionário pronto para ir pro FastAPI.
     """
 
-    with get_conn() as conn, conn.cursor() as cur:
-        # ----------------------------------------------------------
-        # 1) Quem foi o “vencedor” em cada dia/papel
-        # ----------------------------------------------------------
-        cur.execute(
-            """
-            WITH ranked AS (
-              SELECT  p.*,
-                      m.model,
-                      ROW_NUMBER() OVER (
-                        PARTITION BY p.date, p.b3_code_id
-                        ORDER BY ABS(p.value - ph.close) / ph.close
-                      ) AS rk
-              FROM predictions      p
-              JOIN models           m  ON m.id = p.model_id
-              JOIN history_columns  hc ON hc.id = p.history_columns_id
-              JOIN price_history    ph ON ph.company_id = p.b3_code_id
-                                       AND ph.date      = p.date
-              WHERE hc.column_name ILIKE 'close'
-            )
-            SELECT  r.date,
-                    r.b3_code_id,
-                    r.model,
-                    r.value   AS y_pred,
-                    ph.close  AS y_true
-            FROM ranked r
-            JOIN price_history ph
-              ON ph.company_id = r.b3_code_id
-             AND ph.date       = r.date
-            WHERE r.rk = 1;
-            """
-        )
-        winners = pd.DataFrame(
-            cur.fetchall(),
-            columns=["date", "b3_code_id", "model", "y_pred", "y_true"]
-        )
-
-        # ----------------------------------------------------------
-        # 2) Fechamento do dia anterior (para o hit)
-        # ----------------------------------------------------------
-        cur.execute(
-            """
-            SELECT company_id AS b3_code_id,
-                   date,
-                   close
-            FROM price_history
-            ORDER BY b3_code_id, date;
-            """
-        )
-        ph = pd.DataFrame(cur.fetchall(), columns=["b3_code_id", "date", "close"])
+    with (nullcontext(conn) if conn else get_conn()) as conn, conn.cursor() as cur:
+        rows = buscar_winners(cur)
 
-    # ----------------------------------------------------------------
-    # Pós-processamento
-    # ----------------------------------------------------------------
+    return calcular_estatisticas(rows)
+
+
+async def gerar_estatisticas_gerais_async() -> Dict[str, Any]:
+    """Versão assíncrona de gerar_estatisticas_gerais."""
+    rows = await buscar_winners_async()
+    # pós-processamento (pandas/sklearn) fora do event loop
+    return await asyncio.to_thread(calcular_estatisticas, rows)
+
+
+def preparar_winners(winners: pd.DataFrame) -> pd.DataFrame:
+    """Descarta linhas incompletas e calcula abs_err, pct_err e hit."""
     winners = winners.dropna(subset=["y_true", "y_pred"]).copy()
     winners[["y_true", "y_pred"]] = winners[["y_true", "y_pred"]].astype(float)
 
@@ -116,19 +129,24 @@ def gerar_estatisticas_gerais() -> Dict[str, Any]:
     winners["pct_err"] = winners["abs_err"] / winners["y_true"] * 100
 
     # Hit-rate
-    ph["prev_close"] = ph.groupby("b3_code_id")["close"].shift(1)
-    winners = winners.merge(
-        ph[["b3_code_id", "date", "prev_close"]],
-        on=["b3_code_id", "date"],
-        how="left"
-    ).dropna(subset=["prev_close"])
+    winners = winners.dropna(subset=["prev_close"])
     winners["prev_close"] = winners["prev_close"].astype(float)
 
     winners["hit"] = (
         np.sign(winners["y_true"] - winners["prev_close"])
         == np.sign(winners["y_pred"] - winners["prev_close"])
     )
+    return winners
+
+
+@medir_pandas("statistics")
+def calcular_estatisticas(rows) -> Dict[str, Any]:
+    """Métricas + winners JSON a partir das linhas de WINNERS_SQL."""
+    return _metricas(preparar_winners(pd.DataFrame(rows, columns=WINNERS_COLUMNS)))
 
+
+def _metricas(winners: pd.DataFrame) -> Dict[str, Any]:
+    """Métricas + winners JSON de vencedores já preparados."""
     # ----------------------------------------------------------------
     # Métricas
     # ----------------------------------------------------------------
@@ -153,11 +171,8 @@ def gerar_estatisticas_gerais() -> Dict[str, Any]:
     # ----------------------------------------------------------------
     # Winners → lista de dicionários só com tipos nativos
     # ----------------------------------------------------------------
-    winners_json: List[Dict[str, Any]] = (
-        winners
-        .applymap(_numpy_to_py)
-        .assign(date=lambda df: df["date"].astype(str))  # ISO-8601
-        .to_dict(orient="records")
+    winners_json: List[Dict[str, Any]] = frame_to_records(
+        winners.assign(date=winners["date"].astype(str))  # ISO-8601
     )
 
     return {
@@ -166,6 +181,92 @@ def gerar_estatisticas_gerais() -> Dict[str, Any]:
     }
 
 
+# ------------------------------------------------------------------
+# Geral + todos os setores
+# ------------------------------------------------------------------
+def gerar_estatisticas_todos_setores(conn=None) -> Dict[str, Any]:
+    """
+    Estatísticas gerais (com winners) e as métricas de cada setor,
+    a partir de uma única leitura de daily_winners.
+    """
+    with (nullcontext(conn) if conn else get_conn()) as conn, conn.cursor() as cur:
+        dims = dimensions.get(conn=conn)
+        rows = buscar_winners(cur)
+
+    return calcular_estatisticas_todos_setores(rows, dims)
+
+
+async def gerar_estatisticas_todos_setores_async() -> Dict[str, Any]:
+    """Versão assíncrona de gerar_estatisticas_todos_setores."""
+    dims = await dimensions.aget()
+    rows = await buscar_winners_async()
+    return await asyncio.to_thread(calcular_estatisticas_todos_setores, rows, dims)
+
+
+@medir_pandas("statistics")
+def calcular_estatisticas_todos_setores(rows, dims) -> Dict[str, Any]:
+    """
+    Pós-processa os vencedores uma vez e agrega MAE, RMSE, SMAPE, R² e
+    hit-rate por setor com um groupby(sector_id): custo O(vencedores).
+    O setor de cada papel vem do índice de dimensões (`dims`).
+    Os winners vão só no bloco geral; cada setor traz nome e métricas
+    (nulas, com n_obs = 0, para setores ainda sem vencedores).
+    """
+    winners = preparar_winners(pd.DataFrame(rows, columns=WINNERS_COLUMNS))
+    geral = _metricas(winners)
+
+    winners = winners.assign(
+        sector_id=winners["b3_code_id"].map(dims.empresa_setor).astype("Int64")
+    )
+    y_true, y_pred = winners["y_true"], winners["y_pred"]
+    g = winners.assign(
+        sq_err=winners["abs_err"] ** 2,
+        smape=np.abs(y_pred - y_true) / ((np.abs(y_true) + np.abs(y_pred)) / 2),
+        hit=winners["hit"].astype(float),
+    ).groupby("sector_id", sort=True)
+
+    # R² = 1 - SS_res / SS_tot, com a média de y_true de cada setor
+    ss_res = g["sq_err"].sum()
+    ss_tot = (
+        (y_true - g["y_true"].transform("mean")) ** 2
+    ).groupby(winners["sector_id"]).sum()
+    n = g.size()
+    r2 = pd.Series(
+        np.where(
+            ss_tot > 0,
+            1 - ss_res / ss_tot.where(ss_tot > 0, 1.0),
+            np.where(ss_res == 0, 1.0, 0.0),  # mesmo critério do sklearn
+        ),
+        index=ss_res.index,
+    ).where(n >= 2)
+
+    por_setor = pd.DataFrame({
+        "MAE": g["abs_err"].mean().round(4),
+        "RMSE": np.sqrt(g["sq_err"].mean()).round(4),
+        "SMAPE_percentage": (g["smape"].mean() * 100).round(3),
+        "R2": r2.round(4),
+        "Hit_rate_percentage": (g["hit"].mean() * 100).round(2),
+        "n_obs": n,
+    })
+
+    calculadas = {
+        sector_id: {k: (None if k == "R2" and pd.isna(v) else v) for k, v in linha.items()}
+        for sector_id, linha in zip(por_setor.index.tolist(), frame_to_records(por_setor))
+    }
+    # setores sem vencedores entram com métricas nulas e n_obs = 0
+    vazio = dict.fromkeys(por_setor.columns, None) | {"n_obs": 0}
+    setores = [
+        {
+            "sector_id": sector_id,
+            "sector_name": dims.setor_nome.get(sector_id),
+            "stats": calculadas.get(sector_id, vazio),
+        }
+        for sector_id in sorted(set(dims.setor_nome) | set(calculadas))
+    ]
+
+    return {"general": geral, "sectors": setores}
+
+
 # ------------------------------------------------------------------
 # Execução direta
 # ------------------------------------------------------------------
@@ -1,18 +1,24 @@
-import psycopg
+import asyncio
+from contextlib import nullcontext
 import pandas as pd
 import numpy as np
 from sklearn.metrics import r2_score
+from config.db import get_conn as get_db_conn
+from services.dimensions import dimensions
+from services.metrics import medir_pandas
+from services.serialization import frame_to_records
+from services.statistics_service import (
+    RANKED_WINNERS_SQL,
+    buscar_winners,
+    buscar_winners_async,
+    preparar_winners,
+)
 import json
 
 # --------------------------- conexao ---------------------------
 def get_conn():
-    return psycopg.connect(
-        dbname="tcc_b3",
-        user="compareter",
-        password="postgres",
-        host="localhost",
-        port="5432"
-    )
+    """Empresta uma conexão do pool somente leitura."""
+    return get_db_conn(readonly=True)
 
 # --------------------------- métricas auxiliares ----------------
 def smape(y_true, y_pred):
@@ -22,98 +28,66 @@ def smape(y_true, y_pred):
 def hit_rate(df):
     return df["hit"].mean() * 100
 
-
-def to_py(obj):
-    "Converte np.* para int/float padrão."
-    if isinstance(obj, (np.integer,)):
-        return int(obj)
-    if isinstance(obj, (np.floating,)):
-        return float(obj)
-    if isinstance(obj, (np.ndarray,)):
-        return obj.tolist()
-    return obj
+# --------------------------- consultas --------------------------
+# vencedor do dia/papel das empresas do setor, pré-calculado pelo build
+# (ids do setor e nome vêm do índice de dimensões)
+WINNERS_SECTOR_SQL = """
+    SELECT w.date,
+           w.b3_code_id,
+           w.model,
+           w.y_pred,
+           w.y_true,
+           w.prev_close
+    FROM daily_winners w
+    WHERE w.b3_code_id = ANY(%s);
+"""
+# sem daily_winners: ranking na hora, restrito às empresas do setor
+WINNERS_SECTOR_FALLBACK_SQL = RANKED_WINNERS_SQL.format(
+    filtro="AND p.b3_code_id = ANY(%s)"
+)
+WINNERS_COLUMNS = ["date", "b3_code_id", "model", "y_pred", "y_true", "prev_close"]
 
 # --------------------------- principal --------------------------
-def gerar_estatisticas_por_setor(sector_id: int) -> dict:
+def gerar_estatisticas_por_setor(sector_id: int, conn=None) -> dict:
     """
     Calcula MAE, RMSE, SMAPE, R² e Hit-rate
     só para empresas cujo companies.sector_id = sector_id.
     Retorna um dicionário JSON-serializável.
     """
-    with get_conn() as conn, conn.cursor() as cur:
-        # 1) vencedor do dia/papel (dentro do setor)
-        cur.execute(
-            """
-            WITH ranked AS (
-              SELECT p.*,
-                     m.model,
-                     ROW_NUMBER() OVER (
-                       PARTITION BY p.date, p.b3_code_id
-                       ORDER BY ABS(p.value - ph.close) / ph.close
-                     ) AS rk
-              FROM predictions      p
-              JOIN companies        c  ON c.id         = p.b3_code_id
-              JOIN models           m  ON m.id         = p.model_id
-              JOIN history_columns  hc ON hc.id        = p.history_columns_id
-              JOIN price_history    ph ON ph.company_id = p.b3_code_id
-                                       AND ph.date      = p.date
-                JOIN sectors        s  ON s.id         = c.sector_id
-              WHERE hc.column_name ILIKE 'close'
-                AND c.sector_id     = %s
-            )
-            SELECT r.date,
-                   r.b3_code_id,
-                   r.model,
-                   r.value       AS y_pred,
-                   ph.close      AS y_true
-            FROM ranked r
-            JOIN price_history ph
-              ON ph.company_id = r.b3_code_id
-             AND ph.date       = r.date
-            WHERE r.rk = 1;
-            """,
-            (sector_id,),
-        )
-        winners = pd.DataFrame(
-            cur.fetchall(),
-            columns=["date", "b3_code_id", "model", "y_pred", "y_true"]
+    with (nullcontext(conn) if conn else get_conn()) as conn, conn.cursor() as cur:
+        dims = dimensions.get(conn=conn)
+        rows = buscar_winners(
+            cur,
+            WINNERS_SECTOR_SQL,
+            WINNERS_SECTOR_FALLBACK_SQL,
+            (dims.setor_empresas.get(sector_id, []),),
         )
 
-        # 2) preço de fechamento anterior
-        cur.execute(
-            """
-            SELECT company_id AS b3_code_id,
-                   date,
-                   close
-            FROM price_history ph
-            JOIN companies     c ON c.id = ph.company_id
-            WHERE c.sector_id = %s
-            ORDER BY b3_code_id, date;
-            """,
-            (sector_id,),
-        )
-        ph = pd.DataFrame(cur.fetchall(), columns=["b3_code_id", "date", "close"])
+    return calcular_estatisticas_setor(rows, dims.setor_nome[sector_id])
 
-    # -------------------- pós-processamento -----------------------
-    winners = winners.dropna(subset=["y_true", "y_pred"]).copy()
-    winners[["y_true", "y_pred"]] = winners[["y_true", "y_pred"]].astype(float)
-
-    winners["abs_err"] = np.abs(winners["y_true"] - winners["y_pred"])
-    winners["pct_err"] = winners["abs_err"] / winners["y_true"] * 100
-
-    ph["prev_close"] = ph.groupby("b3_code_id")["close"].shift(1)
-    winners = winners.merge(
-        ph[["b3_code_id", "date", "prev_close"]],
-        on=["b3_code_id", "date"],
-        how="left"
-    ).dropna(subset=["prev_close"])
-    winners["prev_close"] = winners["prev_close"].astype(float)
-
-    winners["hit"] = (
-        np.sign(winners["y_true"] - winners["prev_close"])
-        == np.sign(winners["y_pred"] - winners["prev_close"])
+
+async def gerar_estatisticas_por_setor_async(sector_id: int) -> dict:
+    """Versão assíncrona: uma consulta, com ids e nome do setor em memória."""
+    dims = await dimensions.aget()
+    rows = await buscar_winners_async(
+        WINNERS_SECTOR_SQL,
+        WINNERS_SECTOR_FALLBACK_SQL,
+        (dims.setor_empresas.get(sector_id, []),),
+    )
+    # pós-processamento (pandas/sklearn) fora do event loop
+    return await asyncio.to_thread(
+        calcular_estatisticas_setor, rows, dims.setor_nome[sector_id]
     )
 
+
+@medir_pandas("statistics_sector")
+def calcular_estatisticas_setor(rows, sector_name) -> dict:
+    """Métricas + winners JSON a partir das linhas de WINNERS_SECTOR_SQL."""
+    winners = pd.DataFrame(rows, columns=WINNERS_COLUMNS)
+
+    # -------------------- pós-processamento -----------------------
+    winners = preparar_winners(winners)
+
     mae  = winners["abs_err"].mean()
     rmse = np.sqrt((winners["abs_err"] ** 2).mean())
     smp  = smape(winners["y_true"], winners["y_pred"])
@@ -129,24 +103,10 @@ def gerar_estatisticas_por_setor(sector_id: int) -> dict:
         "n_obs":     int(len(winners)),
     }
 
-    winners_json = (
-        winners
-        .applymap(to_py)          # tira np.float64 / np.int64
-        .assign(date=lambda df: df["date"].astype(str))
-        .to_dict(orient="records")
+    winners_json = frame_to_records(
+        winners.assign(date=winners["date"].astype(str))
     )
 
-    with get_conn() as conn, conn.cursor() as cur:
-        cur.execute(
-            """
-            SELECT name
-            FROM sectors
-            WHERE id = %s;
-            """,
-            (sector_id,),
-        )
-        sector_name = cur.fetchone()[0]
-
     return {
         "sector_name": sector_name,
         "stats": stats, 
@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# os testes importam services/ e benchmarks/ como a API (a partir de backend/)
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
@@ -0,0 +1,25 @@
+"""
+Paridade de adicionar_variancias / calcular_acuracias (vetorizadas) com
+a implementação original linha a linha, mantida em
+benchmarks/bench_acuracias.py como referência.
+"""
+import pandas as pd
+import pytest
+
+from benchmarks.bench_acuracias import _frame, _legacy_acuracias, _legacy_variancias
+from services.comparison_service import adicionar_variancias, calcular_acuracias
+
+
+# groupby().apply da referência emite DeprecationWarning no pandas 2.2
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+@pytest.mark.parametrize("decimal", [False, True], ids=["float", "Decimal"])
+@pytest.mark.parametrize("seed", range(3))
+def test_paridade_com_implementacao_original(seed, decimal):
+    df = _frame(3_000, seed, decimal=decimal)
+
+    esperado = _legacy_variancias(df.copy())
+    obtido = adicionar_variancias(df.copy())
+    pd.testing.assert_frame_equal(esperado, obtido)
+
+    for a, b in zip(_legacy_acuracias(esperado), calcular_acuracias(obtido)):
+        pd.testing.assert_frame_equal(a, b)
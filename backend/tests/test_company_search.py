@@ -0,0 +1,55 @@
+from services.company_search import CompanySearchIndex, normalizar
+from services.dimensions import _montar
+
+EMPRESAS = [
+    (1, "PETR4.SA", "Petróleo Brasileiro S.A. - Petrobras", 1),
+    (2, "PETR3.SA", "Petróleo Brasileiro S.A. - Petrobras", 1),
+    (3, "ITUB4.SA", "Itaú Unibanco Holding S.A.", 2),
+    (4, "VALE3.SA", "Vale S.A.", 3),
+    (5, "PRIO3.SA", "PetroRio S.A.", 1),
+    (6, "BBAS3.SA", "Banco do Brasil S.A.", 2),
+]
+SETORES = [(1, "Petróleo"), (2, "Financeiro"), (3, "Mineração")]
+
+
+def _tickers(q, limit=10):
+    indice = CompanySearchIndex(_montar(EMPRESAS, SETORES, None))
+    return [e["ticker"] for e in indice.buscar(q, limit)]
+
+
+def test_normalizar_remove_acentos_e_pontuacao():
+    assert normalizar("Itaú Unibanco S.A.") == "itau unibanco s a"
+
+
+def test_ticker_exato_antes_dos_prefixos():
+    assert _tickers("petr4")[:2] == ["PETR4.SA", "PETR3.SA"]
+    assert _tickers("PETR4.SA")[0] == "PETR4.SA"
+
+
+def test_prefixo_de_ticker_antes_de_prefixo_de_nome():
+    # PETR* casam pelo ticker; PetroRio só pelo nome
+    assert _tickers("petr") == ["PETR3.SA", "PETR4.SA", "PRIO3.SA"]
+
+
+def test_busca_sem_acento_encontra_nome_acentuado():
+    assert _tickers("itau") == ["ITUB4.SA"]
+    assert _tickers("ITAÚ") == ["ITUB4.SA"]
+
+
+def test_palavra_do_meio_do_nome():
+    assert _tickers("unibanco") == ["ITUB4.SA"]
+
+
+def test_consulta_curta_casa_trecho_do_ticker():
+    assert _tickers("3") == ["BBAS3.SA", "PETR3.SA", "PRIO3.SA", "VALE3.SA"]
+
+
+def test_erro_de_digitacao_numa_palavra():
+    assert _tickers("unibnaco") == ["ITUB4.SA"]
+    assert _tickers("petrobas")[:2] == ["PETR3.SA", "PETR4.SA"]
+
+
+def test_limite_e_consulta_vazia():
+    assert len(_tickers("sa", limit=2)) == 2
+    assert _tickers("  ") == []
+    assert _tickers("xyzw") == []
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from services.downsampling import downsample_graph, lttb_indices
+
+
+def _serie(n, series=2, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.normal(0, 1, (n, series)).cumsum(axis=0)
+
+
+@pytest.mark.parametrize("n, n_out", [(10, 3), (10, 9), (100, 7), (1000, 50), (1001, 1000)])
+def test_indices_crescentes_com_extremos(n, n_out):
+    idx = lttb_indices(_serie(n), n_out)
+    assert len(idx) == n_out
+    assert idx[0] == 0 and idx[-1] == n - 1
+    assert np.all(np.diff(idx) > 0)
+
+
+@pytest.mark.parametrize("n_out", [10, 11, 50])
+def test_n_out_maior_ou_igual_a_n_devolve_todos(n_out):
+    np.testing.assert_array_equal(lttb_indices(_serie(10), n_out), np.arange(10))
+
+
+def test_serie_so_com_nan():
+    y = np.full((200, 3), np.nan)
+    idx = lttb_indices(y, 20)
+    assert len(idx) == 20
+    assert idx[0] == 0 and idx[-1] == 199
+    assert np.all(np.diff(idx) > 0)
+
+
+def test_series_com_buracos_e_pico_preservado():
+    y = _serie(300, series=2)
+    y[::3, 1] = np.nan          # modelo sem previsão em alguns dias
+    y[150, 0] = 1e3             # pico isolado
+    idx = lttb_indices(y, 30)
+    assert 150 in idx
+    assert np.all(np.diff(idx) > 0)
+
+
+def test_downsample_graph_mantem_pontos_originais():
+    graph = [
+        {"date": f"{d:02d}/01/2024", "real": float(v), "lstm": float(v) + 1}
+        for d, v in enumerate(_serie(40, series=1)[:, 0], start=1)
+    ]
+    reduzido = downsample_graph(graph, 10)
+    assert len(reduzido) == 10
+    assert reduzido[0] is graph[0] and reduzido[-1] is graph[-1]
+    assert downsample_graph(graph, None) is graph
@@ -0,0 +1,25 @@
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+from services.serialization import dumps
+
+
+def test_nulos_do_pandas_viram_null():
+    assert dumps({"a": pd.NaT, "b": pd.NA}) == b'{"a":null,"b":null}'
+
+
+def test_tipos_convertidos_como_no_jsonable_encoder():
+    payload = {
+        "data": date(2024, 1, 2),
+        "ts": pd.Timestamp("2024-01-02 03:04:05"),
+        "inteiro": Decimal("10"),
+        "decimal": Decimal("1.5"),
+        "np": np.float64(2.5),
+    }
+    assert dumps(payload) == (
+        b'{"data":"2024-01-02","ts":"2024-01-02T03:04:05",'
+        b'"inteiro":10,"decimal":1.5,"np":2.5}'
+    )
@@ -0,0 +1,66 @@
+"""
+calcular_estatisticas_todos_setores (groupby único) contra
+calcular_estatisticas_setor (sklearn, um setor por vez).
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from services.dimensions import _montar
+from services.statistics_service import calcular_estatisticas_todos_setores
+from services.statistics_service_sector import calcular_estatisticas_setor
+
+SETORES = [(1, "Petróleo"), (2, "Financeiro"), (3, "Constante"), (4, "Vazio")]
+# empresa → setor; o setor 3 tem y_true constante (regra do sklearn p/ R²)
+EMPRESAS = [(i, f"TK{i:03d}.SA", f"Empresa {i}", 1 + (i - 1) % 3) for i in range(1, 10)]
+
+
+def _rows(seed=0, dias=40):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for cid, _, _, sid in EMPRESAS:
+        preco = rng.uniform(5, 80)
+        for d in range(dias):
+            dia = date(2024, 1, 1) + timedelta(days=d)
+            anterior = preco
+            if sid != 3:
+                preco = preco * (1 + rng.normal(0, 0.02))
+            previsto = preco * (1 + rng.normal(0, 0.03))
+            rows.append((
+                dia, cid, "LSTM",
+                Decimal(str(round(previsto, 6))),
+                Decimal(str(round(preco, 6))),
+                None if d == 0 else Decimal(str(round(anterior, 6))),
+            ))
+    return rows
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_metricas_por_setor_iguais_ao_calculo_de_um_setor(seed):
+    rows = _rows(seed)
+    dims = _montar(EMPRESAS, SETORES, None)
+
+    todos = calcular_estatisticas_todos_setores(rows, dims)
+    por_setor = {s["sector_id"]: s for s in todos["sectors"]}
+
+    for sid, ids in dims.setor_empresas.items():
+        linhas = [r for r in rows if r[1] in ids]
+        if not linhas:
+            continue
+        esperado = calcular_estatisticas_setor(linhas, dims.setor_nome[sid])
+        obtido = por_setor[sid]
+        assert obtido["sector_name"] == esperado["sector_name"]
+        assert obtido["stats"] == pytest.approx(esperado["stats"], abs=1e-4)
+
+
+def test_setor_sem_vencedores_aparece_com_metricas_nulas():
+    dims = _montar(EMPRESAS, SETORES, None)
+    setores = calcular_estatisticas_todos_setores(_rows(), dims)["sectors"]
+
+    assert [s["sector_id"] for s in setores] == [1, 2, 3, 4]
+    vazio = setores[-1]
+    assert vazio["sector_name"] == "Vazio"
+    assert vazio["stats"]["n_obs"] == 0
+    assert vazio["stats"]["MAE"] is None and vazio["stats"]["R2"] is None
@@ -7,6 +7,7 @@ import { Comparison } from "../types/Comparison";
 import { GraphData } from "../types/GraphData";
 import { Statistics } from "../types/Statistics";
 import { STATISTICS_NAME } from "../types/Statistics";
+import { Dashboard } from "../types/Dashboard";
 import Loader from "./ui/loader";
 
 interface Props {
@@ -27,32 +28,16 @@ export const CompanyDetails = ({ company }: Props) => {
             setGraphData(null);
             setComparisonData(null);
             setStatistics(null);
-            const fetchGraphData = async () => {
-                const [graphRes] = await Promise.all([
-                    axios.get(
-                        `http://localhost:9000/prediction/${company.ticker}`
-                    ),
-                ]);
-                setGraphData(graphRes.data);
-            };
-            const fetchStatistics = async () => {
-                // const statisticsRes = await axios.get<Statistics>(
-                //     `http://localhost:9000/statistics/${company.sector_id}`
-                // );
-                const [statisticsRes, comparisonRes] = await Promise.all([
-                    axios.get<Statistics>(
-                        `http://localhost:9000/statistics/${company.sector_id}`
-                    ),
-                    axios.get<Comparison>(
-                        `http://localhost:9000/comparison/${company.ticker}`
-                    ),
-                ]);
-                setStatistics(statisticsRes.data);
-                setComparisonData(comparisonRes.data);
+            const fetchDashboard = async () => {
+                const dashboardRes = await axios.get<Dashboard>(
+                    `http://localhost:9000/company/${company.ticker}/dashboard`
+                );
+                setGraphData(dashboardRes.data.graph);
+                setStatistics(dashboardRes.data.statistics);
+                setComparisonData(dashboardRes.data.comparison);
             };
 
-            fetchGraphData();
-            fetchStatistics();
+            fetchDashboard();
         }
     }, [company]);
 
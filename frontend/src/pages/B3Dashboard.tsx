@@ -1,4 +1,4 @@
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import axios from "axios";
 import { Header } from "../components/Header";
 import { SectorSidebar } from "../components/SectorSidebar";
@@ -16,15 +16,15 @@ export default function B3Dashboard() {
     const [filteredSuggestions, setFilteredSuggestions] = useState<Company[]>(
         []
     );
+    // última busca enviada: respostas de buscas anteriores são descartadas
+    const latestQuery = useRef("");
 
     useEffect(() => {
         const fetchData = async () => {
             try {
-                const [companyRes, sectorRes] = await Promise.all([
-                    axios.get<Company[]>("http://localhost:9000/companies"),
-                    axios.get<string[]>("http://localhost:9000/sectors"),
-                ]);
-                setCompanies(companyRes.data);
+                const sectorRes = await axios.get<string[]>(
+                    "http://localhost:9000/sectors"
+                );
                 setSectors(sectorRes.data);
             } catch (error) {
                 console.error("Erro ao buscar dados da API:", error);
@@ -34,19 +34,48 @@ export default function B3Dashboard() {
         fetchData();
     }, []);
 
-    const handleSearchChange = (e: React.ChangeEvent<HTMLInputElement>) => {
+    // empresas só do setor aberto na barra lateral
+    useEffect(() => {
+        if (!selectedSector) {
+            setCompanies([]);
+            return;
+        }
+        const fetchCompanies = async () => {
+            try {
+                const res = await axios.get<Company[]>(
+                    "http://localhost:9000/companies",
+                    { params: { sector: selectedSector } }
+                );
+                setCompanies(res.data);
+            } catch (error) {
+                console.error("Erro ao buscar empresas do setor:", error);
+            }
+        };
+
+        fetchCompanies();
+    }, [selectedSector]);
+
+    const handleSearchChange = async (
+        e: React.ChangeEvent<HTMLInputElement>
+    ) => {
         const value = e.target.value;
         setSearchTerm(value);
-        if (value.length > 0) {
-            const valueLower = value.toLowerCase();
-            const companyMatches = companies.filter(
-                (c) =>
-                    c.ticker.toLowerCase().includes(valueLower) ||
-                    c.name.toLowerCase().includes(valueLower)
-            );
-            setFilteredSuggestions(companyMatches);
-        } else {
+        latestQuery.current = value;
+        if (value.trim().length === 0) {
             setFilteredSuggestions([]);
+            return;
+        }
+        try {
+            // busca no servidor (ticker/nome, sem diferenciar acentos)
+            const res = await axios.get<Company[]>(
+                "http://localhost:9000/companies/search",
+                { params: { q: value, limit: 10 } }
+            );
+            if (latestQuery.current === value) {
+                setFilteredSuggestions(res.data);
+            }
+        } catch (error) {
+            console.error("Erro ao buscar sugestões:", error);
         }
     };
 
@@ -54,6 +83,7 @@ export default function B3Dashboard() {
         setSelectedCompany(item);
         setSelectedSector(null);
         setSearchTerm(item.ticker);
+        latestQuery.current = "";
         setFilteredSuggestions([]);
     };
 
@@ -0,0 +1,9 @@
+import { Comparison } from "./Comparison";
+import { GraphData } from "./GraphData";
+import { Statistics } from "./Statistics";
+
+export interface Dashboard {
+    graph: GraphData;
+    comparison: Comparison;
+    statistics: Statistics;
+}